@@ -10,6 +10,7 @@ import subprocess
 import sys
 import json
 import logging
+import multiprocessing
 import os
 from pathlib import Path
 import pandas as pd
@@ -809,4 +810,6 @@ def main():
         raise
 
 if __name__ == '__main__':
+    # Lookup worker processes are spawned from the frozen executable
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Optional, Tuple
+from urllib.parse import urljoin
+
+import aiohttp
+
+from app.HttpLookupEngine import (
+    CAPTCHA_ERROR_TEXT,
+    HttpLookupEngine,
+    flatten_captcha,
+    legacy_ssl_context,
+    parse_form
+)
+
+
+class _AsyncSessionSlot:
+    """One server-side session with its own cookie jar (JSESSIONID)."""
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.pages: dict = {}
+
+
+class AsyncLookupEngine:
+    """Keeps many tracuunnt form lookups in flight on one asyncio event loop."""
+
+    def __init__(self,
+                 predictor: Any,
+                 archive: Optional[Any] = None,
+                 base_url: Optional[str] = None,
+                 concurrency: int = 50,
+                 timeout: int = 20,
+                 max_captcha_attempts: int = 5,
+                 predict_lock: Optional[threading.Lock] = None,
+                 executor: Optional[Executor] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            predictor: CaptchaPredictor used to solve the captcha image
+            archive: CaptchaArchive receiving solved captchas, or None
+            base_url: Site root, override to point at a local stand-in server
+            concurrency: Maximum number of lookups in flight
+            timeout: HTTP timeout in seconds
+            max_captcha_attempts: Captcha attempts per lookup
+            predict_lock: Lock serializing model inference between threads
+            executor: Executor for captcha inference, a single thread by default
+        """
+        self.predictor = predictor
+        self.archive = archive
+        self.base_url = base_url or HttpLookupEngine.DEFAULT_BASE_URL
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_captcha_attempts = max_captcha_attempts
+        self.predict_lock = predict_lock or threading.Lock()
+        self.executor = executor
+        self._own_executor = executor is None
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._slots: Optional[asyncio.Queue] = None
+
+    async def __aenter__(self) -> 'AsyncLookupEngine':
+        """Open the shared connector and one session per concurrent lookup."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='captcha')
+        self._connector = aiohttp.TCPConnector(ssl=legacy_ssl_context(), limit=self.concurrency)
+        self._slots = asyncio.Queue()
+        for _ in range(self.concurrency):
+            session = aiohttp.ClientSession(
+                connector=self._connector,
+                connector_owner=False,
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                timeout=self.timeout
+            )
+            self._slots.put_nowait(_AsyncSessionSlot(session))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Close all sessions, the connector and the inference executor."""
+        while not self._slots.empty():
+            await self._slots.get_nowait().session.close()
+        await self._connector.close()
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def submit(self, page: str, field: str, value: str) -> str:
+        """
+        Fill `field` on `page`, solve the captcha and submit, waiting for a free session.
+
+        Returns:
+            The HTML of the result page
+
+        Raises:
+            Exception: If the captcha is still rejected after all attempts
+        """
+        page_url = urljoin(self.base_url, page)
+        slot = await self._slots.get()
+        try:
+            for attempt in range(self.max_captcha_attempts):
+                html = slot.pages.get(page) or await self._get(slot, page_url)
+                action, fields, captcha_url = parse_form(html, field, page_url)
+
+                image_binary, solved_captcha = await self._solve_captcha(slot, captcha_url)
+                logging.info(f"Predicted captcha: {solved_captcha}")
+
+                fields[field] = value
+                fields['captcha'] = solved_captcha
+                async with slot.session.post(action, data=fields) as response:
+                    response.raise_for_status()
+                    html = await response.text()
+                slot.pages[page] = html
+
+                accepted = CAPTCHA_ERROR_TEXT not in html
+                if self.archive:
+                    self.archive.save(image_binary, solved_captcha, accepted, page)
+                if not accepted:
+                    logging.info(f"Captcha attempt {attempt + 1} rejected")
+                    continue
+                return html
+
+            raise Exception(f"Failed to solve captcha after {self.max_captcha_attempts} attempts")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # Drop the server session, it may have expired or been left mid-request
+            slot.pages.clear()
+            slot.session.cookie_jar.clear()
+            raise
+        finally:
+            self._slots.put_nowait(slot)
+
+    @staticmethod
+    async def _get(slot: _AsyncSessionSlot, page_url: str) -> str:
+        """Load the lookup page, establishing JSESSIONID on first use."""
+        async with slot.session.get(page_url) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    async def _solve_captcha(self, slot: _AsyncSessionSlot, captcha_url: str) -> Tuple[bytes, str]:
+        """Download the captcha and run inference off the event loop."""
+        async with slot.session.get(captcha_url) as response:
+            response.raise_for_status()
+            image_content = await response.read()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._predict, image_content)
+
+    def _predict(self, image_content: bytes) -> Tuple[bytes, str]:
+        """Flatten and solve one captcha in memory (runs in the executor)."""
+        image_binary = flatten_captcha(image_content)
+        with self.predict_lock:
+            return image_binary, self.predictor.predict(image_binary)
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+
+class CaptchaArchive:
+    """
+    Content-addressed store of solved captchas, written in the background.
+
+    Each image is stored once as `store/<h[:2]>/<h[2:4]>/<sha256>.png`, and a
+    line describing it (hash, predicted label, outcome, timestamp, page) is
+    appended to `store/manifest.jsonl`. Images already in the store are skipped.
+    Worker processes saving the same image at once, or a process killed after
+    the manifest append, can leave a repeated or image-less line; readers skip those.
+    """
+
+    MANIFEST = "manifest.jsonl"
+
+    def __init__(self, captcha_dir: Union[str, Path]):
+        self.store_dir = Path(captcha_dir) / "store"
+        self.manifest_path = self.store_dir / self.MANIFEST
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='captcha-archive')
+
+    def save(self, image_binary: bytes, solved_captcha: str, accepted: bool, page: Optional[str] = None) -> None:
+        """Queue a captcha image, labelled with the predicted text, for writing."""
+        self._executor.submit(self._write, image_binary, solved_captcha, accepted, page)
+
+    def _write(self, image_binary: bytes, solved_captcha: str, accepted: bool, page: Optional[str]) -> None:
+        try:
+            digest = hashlib.sha256(image_binary).hexdigest()
+            path = self.store_dir / digest[:2] / digest[2:4] / f"{digest}.png"
+            if path.exists():
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # The image only takes its final name once its manifest line is on disk,
+            # so a process killed in between leaves no unlisted image to dedupe against
+            tmp_path = path.with_name(f"{digest}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(image_binary)
+
+            record = {
+                'hash': digest,
+                'label': solved_captcha,
+                'outcome': 'accepted' if accepted else 'rejected',
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'page': page,
+                'path': path.relative_to(self.store_dir).as_posix()
+            }
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Failed to archive captcha {solved_captcha}: {e}")
+
+    def close(self, wait: bool = True) -> None:
+        """Flush queued captchas and stop the writer thread."""
+        self._executor.shutdown(wait=wait)
+
+
+def read_manifest(manifest_path: Union[str, Path], outcome: Optional[str] = 'accepted') -> Iterator[Dict]:
+    """
+    Yield manifest records, with `path` resolved next to the manifest, once per
+    image and only for images present in the store.
+
+    Args:
+        manifest_path: The store's manifest.jsonl
+        outcome: Only records with this outcome ('accepted' or 'rejected'), or None for all
+    """
+    manifest_path = Path(manifest_path)
+    seen = set()
+    with open(manifest_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a killed process
+                continue
+            if outcome is None or record.get('outcome') == outcome:
+                path = manifest_path.parent / record['path']
+                # The image is moved into place after its line is written
+                if record['hash'] in seen or not path.exists():
+                    continue
+                seen.add(record['hash'])
+                record['path'] = str(path)
+                yield record
+
+
+def labelled_samples(source: Union[str, Path]) -> List[Tuple[str, str]]:
+    """
+    (image path, label) pairs from a store manifest (accepted captchas) or from a
+    folder of `<label>.png` / `<label>_<timestamp>.png` files such as capcha_ok.
+    """
+    source = Path(source)
+    if source.suffix == '.jsonl':
+        return [(record['path'], record['label']) for record in read_manifest(source)]
+    return [(str(path), path.stem.split('_')[0]) for path in sorted(source.glob('*.png'))]
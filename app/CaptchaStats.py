@@ -0,0 +1,33 @@
+import threading
+
+
+class CaptchaStats:
+    """Counts captcha submits and in-place refreshes per lookup, to tune the confidence threshold."""
+
+    def __init__(self, min_confidence: float):
+        self.min_confidence = min_confidence
+        self.solved = 0
+        self.failed = 0
+        self.submits = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+
+    def record(self, submits: int, refreshes: int, solved: bool) -> None:
+        """Add the captcha work spent on one lookup."""
+        with self._lock:
+            self.submits += submits
+            self.refreshes += refreshes
+            if solved:
+                self.solved += 1
+            else:
+                self.failed += 1
+
+    def summary(self) -> str:
+        """One log line: submits and refreshes per successful lookup at the current threshold."""
+        with self._lock:
+            per_lookup = max(1, self.solved)
+            return (
+                f"Captcha threshold {self.min_confidence}: {self.solved} solved, {self.failed} failed, "
+                f"{self.submits / per_lookup:.2f} submits and {self.refreshes / per_lookup:.2f} "
+                f"refreshes per successful lookup"
+            )
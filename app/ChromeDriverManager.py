@@ -5,7 +5,12 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import WebDriverException, TimeoutException
+from selenium.common.exceptions import (
+    WebDriverException,
+    TimeoutException,
+    JavascriptException,
+    StaleElementReferenceException
+)
 from pathlib import Path
 import logging
 import time
@@ -215,9 +220,43 @@ class ChromeDriverManager:
 
     def execute_script( self, script: Any, *args: Any):
         try:
-            return self.driver.execute_script(script)
+            return self.driver.execute_script(script, *args)
         except TimeoutException as e:
             logging.error(e)
+
+    def wait_for_script(
+        self,
+        script: str,
+        timeout: Optional[int] = None,
+        poll_frequency: float = 0.1
+    ) -> Any:
+        """
+        Poll a script until it returns a truthy value.
+        
+        Args:
+            script: JavaScript returning a falsy value until the condition holds
+            timeout: Wait timeout in seconds
+            poll_frequency: Seconds between polls
+            
+        Returns:
+            The first truthy value returned by the script
+            
+        Raises:
+            TimeoutException: If the script stays falsy within timeout
+        """
+        timeout = timeout or self.wait_timeout
+        try:
+            return WebDriverWait(
+                self.driver,
+                timeout,
+                poll_frequency=poll_frequency,
+                # The page may be navigating between polls
+                ignored_exceptions=(JavascriptException, StaleElementReferenceException)
+            ).until(lambda driver: driver.execute_script(script))
+        except TimeoutException as e:
+            raise TimeoutException(
+                f"Page outcome not detected after {timeout} seconds"
+            ) from e
             
 
     def wait_for_element(
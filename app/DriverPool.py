@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from queue import Empty, Queue
+from selenium.webdriver.common.by import By
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.ChromeDriverManager import ChromeDriverManager
+
+
+class DriverPool:
+    """Keeps N Chrome sessions parked on a lookup page and shards IDs across them."""
+
+    def __init__(self,
+                 manager_factory: Callable[[], ChromeDriverManager],
+                 size: int = 1):
+        """
+        Initialize the pool.
+
+        Args:
+            manager_factory: Callable returning a new, not yet started ChromeDriverManager
+            size: Number of Chrome sessions to keep warm
+        """
+        self.manager_factory = manager_factory
+        self.size = max(1, int(size))
+        self.managers: List[ChromeDriverManager] = []
+        self._progress_lock = threading.Lock()
+
+    @contextmanager
+    def open(self, url: str, ready_field: str) -> Iterator['DriverPool']:
+        """Start the sessions, park them on `url` and quit them all on exit."""
+        try:
+            self.start(url, ready_field)
+            yield self
+        finally:
+            self.close()
+
+    def start(self, url: str, ready_field: str) -> None:
+        """Start all sessions in parallel and wait until each shows `ready_field`."""
+        def start_one(worker_id: int) -> Optional[ChromeDriverManager]:
+            manager = self.manager_factory()
+            try:
+                manager.__enter__()
+                self._park(manager, url, ready_field)
+                return manager
+            except Exception as e:
+                logging.error(f"Failed to start pool session {worker_id}: {e}")
+                manager._cleanup_driver()
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            started = list(executor.map(start_one, range(self.size)))
+
+        self.managers = [m for m in started if m is not None]
+        if not self.managers:
+            raise RuntimeError("No Chrome session could be started")
+        logging.info(f"Driver pool ready with {len(self.managers)}/{self.size} sessions")
+
+    def close(self) -> None:
+        """Quit every session in the pool."""
+        for manager in self.managers:
+            manager._cleanup_driver()
+        self.managers = []
+
+    @staticmethod
+    def _park(manager: ChromeDriverManager, url: str, ready_field: str) -> None:
+        """Load the lookup page and wait for its input field."""
+        manager.driver.get(url)
+        manager.wait_for_element(By.NAME, ready_field)
+
+    def map(self,
+            ids: List[str],
+            handler: Callable[[int, ChromeDriverManager, str], Dict[str, Any]],
+            on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Run `handler(worker_id, manager, id)` for every ID across the pool.
+
+        IDs are pulled from a shared queue, so a slow session never holds back
+        the others. Results are returned in the order of `ids`, or, with
+        `on_result`, handed to `on_result(index, result)` from the session's
+        thread as each lookup completes and not kept.
+        """
+        total = len(ids)
+        results: List[Dict[str, Any]] = [] if on_result else [{}] * total
+        done = [0]
+        tasks: Queue = Queue()
+        for item in enumerate(ids):
+            tasks.put(item)
+
+        def worker(worker_id: int, manager: ChromeDriverManager) -> None:
+            while True:
+                try:
+                    idx, value = tasks.get_nowait()
+                except Empty:
+                    return
+                try:
+                    result = handler(worker_id, manager, value)
+                except Exception as e:
+                    logging.error(f"Failed to process {value}: {str(e)}")
+                    result = {'error': str(e)}
+                if on_result:
+                    on_result(idx, result)
+                else:
+                    results[idx] = result
+                with self._progress_lock:
+                    done[0] += 1
+                    logging.info(f"Processed {done[0]}/{total} IDs")
+
+        if len(self.managers) == 1:
+            worker(0, self.managers[0])
+        else:
+            threads = [
+                threading.Thread(target=worker, args=(worker_id, manager), daemon=True)
+                for worker_id, manager in enumerate(self.managers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        return results
@@ -0,0 +1,174 @@
+from __future__ import annotations
+import logging
+import ssl
+import threading
+from io import BytesIO
+from queue import Queue
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+import lxml.html
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+from app.PageScripts import CAPTCHA_ERROR_TEXT
+
+
+def legacy_ssl_context() -> ssl.SSLContext:
+    """SSL context allowing legacy TLS renegotiation, as in app/utils/downloadCaptcha.py."""
+    ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    ctx.options |= 0x4  # OP_LEGACY_SERVER_CONNECT
+    return ctx
+
+
+def parse_form(html: str, field: str, page_url: str) -> Tuple[str, Dict[str, str], str]:
+    """Return the action, current field values and captcha image URL of the form holding `field`."""
+    doc = lxml.html.fromstring(html)
+    for form in doc.forms:
+        if form.xpath(f'.//input[@name="{field}"]'):
+            action = urljoin(page_url, form.action or page_url)
+            fields = {k: v for k, v in form.form_values()}
+            images = form.xpath('.//img[contains(@src, "captcha")]/@src')
+            captcha_url = urljoin(page_url, images[0] if images else 'captcha.png')
+            return action, fields, captcha_url
+    raise Exception(f"Lookup form with field '{field}' not found on {page_url}")
+
+
+def flatten_captcha(image_content: bytes) -> bytes:
+    """Flatten the transparent captcha PNG on white, like the browser renders it."""
+    im = Image.open(BytesIO(image_content)).convert('RGBA')
+    new_image = Image.new("RGBA", im.size, "WHITE")
+    new_image.paste(im, (0, 0), im)
+    buffer = BytesIO()
+    new_image.convert('RGB').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class LegacyTLSAdapter(HTTPAdapter):
+    """HTTPAdapter that accepts the legacy TLS renegotiation used by tracuunnt."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = legacy_ssl_context()
+        return super().init_poolmanager(*args, **kwargs)
+
+
+class _SessionSlot:
+    """One server-side session: cookies (JSESSIONID) plus the last page it saw."""
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+        self.pages: Dict[str, str] = {}
+
+
+class HttpLookupEngine:
+    """Submits tracuunnt lookup forms over plain HTTP instead of driving Chrome."""
+
+    DEFAULT_BASE_URL = 'https://tracuunnt.gdt.gov.vn/tcnnt/'
+
+    def __init__(self,
+                 predictor: Any,
+                 archive: Optional[Any] = None,
+                 base_url: Optional[str] = None,
+                 pool_size: int = 1,
+                 timeout: int = 20,
+                 max_captcha_attempts: int = 5,
+                 predict_lock: Optional[threading.Lock] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            predictor: CaptchaPredictor used to solve the captcha image
+            archive: CaptchaArchive receiving solved captchas, or None
+            base_url: Site root, override to point at a local stand-in server
+            pool_size: Number of independent server sessions kept alive
+            timeout: HTTP timeout in seconds
+            max_captcha_attempts: Captcha attempts per lookup
+            predict_lock: Lock serializing model inference between threads
+        """
+        self.predictor = predictor
+        self.archive = archive
+        self.base_url = base_url or self.DEFAULT_BASE_URL
+        self.timeout = timeout
+        self.max_captcha_attempts = max_captcha_attempts
+        self.predict_lock = predict_lock or threading.Lock()
+        self._slots: Queue = Queue()
+        for _ in range(max(1, int(pool_size))):
+            self._slots.put(_SessionSlot(self._new_session()))
+
+    @staticmethod
+    def _new_session() -> requests.Session:
+        """Create a session with a legacy-TLS, keep-alive connection."""
+        session = requests.Session()
+        session.mount('https://', LegacyTLSAdapter(pool_connections=1, pool_maxsize=1))
+        session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        session.headers['User-Agent'] = (
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+            '(KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36'
+        )
+        return session
+
+    def close(self) -> None:
+        """Close every pooled session."""
+        while not self._slots.empty():
+            self._slots.get_nowait().session.close()
+
+    def submit(self, page: str, field: str, value: str) -> str:
+        """
+        Fill `field` on `page` (e.g. 'mstdn.jsp'), solve the captcha and submit.
+
+        Returns:
+            The HTML of the result page
+
+        Raises:
+            Exception: If the captcha is still rejected after all attempts
+        """
+        slot = self._slots.get()
+        try:
+            for attempt in range(self.max_captcha_attempts):
+                html = slot.pages.get(page) or self._get(slot, page)
+                action, fields, captcha_url = parse_form(html, field, urljoin(self.base_url, page))
+
+                image_binary, solved_captcha = self._solve_captcha(slot, captcha_url)
+                logging.info(f"Predicted captcha: {solved_captcha}")
+
+                fields[field] = value
+                fields['captcha'] = solved_captcha
+                response = slot.session.post(action, data=fields, timeout=self.timeout)
+                response.raise_for_status()
+                html = response.text
+                # The result page carries a fresh form, reuse it for the next lookup
+                slot.pages[page] = html
+
+                accepted = CAPTCHA_ERROR_TEXT not in html
+                if self.archive:
+                    self.archive.save(image_binary, solved_captcha, accepted, page)
+                if not accepted:
+                    logging.info(f"Captcha attempt {attempt + 1} rejected")
+                    continue
+                return html
+
+            raise Exception(f"Failed to solve captcha after {self.max_captcha_attempts} attempts")
+        except requests.RequestException:
+            # Drop the server session, it may have expired
+            slot.pages.clear()
+            slot.session.cookies.clear()
+            raise
+        finally:
+            self._slots.put(slot)
+
+    def _get(self, slot: _SessionSlot, page: str) -> str:
+        """Load the lookup page, establishing JSESSIONID on first use."""
+        response = slot.session.get(urljoin(self.base_url, page), timeout=self.timeout)
+        response.raise_for_status()
+        slot.pages[page] = response.text
+        return response.text
+
+    def _solve_captcha(self, slot: _SessionSlot, captcha_url: str) -> Tuple[bytes, str]:
+        """Download the captcha for this session and predict its text in memory."""
+        response = slot.session.get(captcha_url, timeout=self.timeout)
+        response.raise_for_status()
+
+        image_binary = flatten_captcha(response.content)
+        with self.predict_lock:
+            return image_binary, self.predictor.predict(image_binary)
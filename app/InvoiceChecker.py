@@ -1,30 +1,60 @@
 # -*- coding: utf8 -*-
 from __future__ import annotations
-import io
+import copy
 import logging
-import os
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
-from PIL import Image
-from Screenshot import Screenshot
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import (
-    TimeoutException, 
-    StaleElementReferenceException
-)
+from selenium.common.exceptions import StaleElementReferenceException
 
 from app.DocxReportGenerator import DocxReportGenerator
 from app.ChromeDriverManager import ChromeDriverManager
-from check_re import CaptchaPredictor
+from app.AsyncLookupEngine import AsyncLookupEngine
+from app.CaptchaArchive import CaptchaArchive
+from app.CaptchaStats import CaptchaStats
+from app.HttpLookupEngine import HttpLookupEngine
+from app.LookupRunner import journaled_run, lookup_type, run_lookups, run_lookups_async
+from app.PageScripts import (
+    CAPTCHA_REFRESHED_SCRIPT,
+    CLEAR_OUTCOME_SCRIPT,
+    EXTRACT_TABLE_SCRIPT,
+    FILL_AND_SUBMIT_SCRIPT,
+    OUTCOME_SCRIPT,
+    REFRESH_CAPTCHA_SCRIPT
+)
+from app.LookupJournal import DONE, FAILED
+from app.ResultCache import ResultCache
+from app.ResultSink import ResultSink
+from app.ResultTable import ERROR, LookupRecord, ParsedResult, parse_result_page, result_from_table
+from app.ScreenshotBackend import get_screenshot_backend
+from app.ScreenshotWriter import ScreenshotWriter
+from captcha_runtime import load_captcha_predictor
 
 class InvoiceChecker:
     """Optimized system for checking and processing invoices."""
     
+    LOOKUP_URL = 'https://tracuunnt.gdt.gov.vn/tcnnt/mstdn.jsp'
+    LOOKUP_PAGE = 'mstdn.jsp'
+    READY_FIELD = 'mst'
+    # Result table header -> LookupRecord field, in page order
+    RESULT_COLUMNS = {
+        'MST': 'id',
+        'Tên người nộp thuế': 'name',
+        'Cơ quan thuế': 'authority',
+        'Số CMT/Thẻ căn cước người đại diện': 'id_number',
+        'Ngày thay đổi thông tin gần nhất': 'updated',
+        'Ghi chú': 'note'
+    }
+    # Form field filled by each row handler, used by the HTTP engine
+    ROW_FIELDS = {'process_invoice_row': 'mst'}
+    
     def __init__(
         self, 
         path: str | Path, 
@@ -41,15 +71,92 @@ class InvoiceChecker:
         self.wait_timeout = wait_timeout
         self.max_retries = max_retries
         self.max_captcha_attempts = max_captcha_attempts
-        self.predictor = CaptchaPredictor('captcha.keras')
+        # Loaded on first use: a process-executor parent only needs it for the captcha server
+        self._predictor = None
+        self._predictor_load_lock = threading.Lock()
         self.signal_handler = signal_handler
-        self.driver_manager = ChromeDriverManager(
-            is_headless=config.get('headless', True),
+        self.pool_size = int(config.get('pool_size', 1))
+        self.executor = config.get('executor', 'thread')
+        self.engine = config.get('engine', 'selenium')
+        self.http_engine = None
+        self.async_engine = None
+        self.batched_submit = config.get('batched_submit', 'True') == 'True'
+        self.screenshot_backend = get_screenshot_backend(config.get('screenshot_backend', 'cdp'))
+        self.screenshot_writer = None
+        if config.get('screenshot_async', 'True') == 'True' and hasattr(self.screenshot_backend, 'capture_png'):
+            self.screenshot_writer = ScreenshotWriter(
+                self.data_dir.joinpath("screenshot"),
+                image_format=config.get('screenshot_format', 'png'),
+                quality=int(config.get('screenshot_quality', 80))
+            )
+        self.captcha_archive = None
+        if config.get('archive_captcha', 'True') == 'True':
+            self.captcha_archive = CaptchaArchive(self.path.joinpath("captcha"))
+        # Below this sequence confidence the captcha is refreshed instead of submitted
+        self.captcha_min_confidence = float(config.get('captcha_min_confidence', 0.5))
+        self.max_captcha_refreshes = int(config.get('captcha_max_refreshes', 3))
+        self.captcha_stats = CaptchaStats(self.captcha_min_confidence)
+        self.result_cache = None
+        if config.get('result_cache', 'True') == 'True':
+            self.result_cache = ResultCache(
+                self.path.joinpath("cache", "results.sqlite"),
+                ttl=float(config.get('result_cache_ttl_hours', 24)) * 3600,
+                max_entries=int(config.get('result_cache_max_entries', 100000))
+            )
+        self.worker_id = 0
+        self._predict_lock = threading.Lock()
+        self.driver_manager = self._new_driver_manager()
+    
+    def _new_driver_manager(self) -> ChromeDriverManager:
+        """Create a driver manager configured for this checker."""
+        return ChromeDriverManager(
+            is_headless=self.config.get('headless', True),
             path=self.path,
             download_dir=self.data_dir
         )
-    
-    
+
+    def _new_http_engine(self, pool_size: int) -> HttpLookupEngine:
+        """Create an HTTP lookup engine sharing this checker's predictor."""
+        return HttpLookupEngine(
+            self.predictor,
+            archive=self.captcha_archive,
+            base_url=self.config.get('http_base_url'),
+            pool_size=pool_size,
+            timeout=self.wait_timeout,
+            max_captcha_attempts=self.max_captcha_attempts,
+            predict_lock=self._predict_lock
+        )
+
+    def _new_async_engine(self) -> AsyncLookupEngine:
+        """Create an asyncio lookup engine sharing this checker's predictor."""
+        return AsyncLookupEngine(
+            self.predictor,
+            archive=self.captcha_archive,
+            base_url=self.config.get('http_base_url'),
+            concurrency=int(self.config.get('async_concurrency', 50)),
+            timeout=self.wait_timeout,
+            max_captcha_attempts=self.max_captcha_attempts,
+            predict_lock=self._predict_lock
+        )
+
+    @property
+    def predictor(self) -> Any:
+        """The captcha predictor from config, loaded once and shared by bound copies."""
+        if self._predictor is None:
+            with self._predictor_load_lock:
+                if self._predictor is None:
+                    self._predictor = load_captcha_predictor(self.config)
+        return self._predictor
+
+    def _bind(self, worker_id: int, driver_manager: ChromeDriverManager) -> 'InvoiceChecker':
+        """Return a shallow copy of this checker driving the given pool session."""
+        # Load before copying, so the pool sessions share one predictor
+        self.predictor
+        worker = copy.copy(self)
+        worker.worker_id = worker_id
+        worker.driver_manager = driver_manager
+        return worker
+
 
     def _wait_for_element(
         self, 
@@ -64,37 +171,24 @@ class InvoiceChecker:
     def process_invoice_row(self, mst: str) -> Dict:
         """Process a single invoice row with improved error handling."""
         try:
-            self._fill_form_safely('mst', mst)
-            self._handle_captcha()
+            self._handle_captcha('mst', mst)
             
-            # Wait for and get result
-            """Wait for and parse result table."""
-        
-            result_element = self._wait_for_element(
-                By.CLASS_NAME, 
-                "ta_border",
-                timeout=5
-            )
-            result_html = result_element.get_attribute("outerHTML")
+            # Read the result table as records inside the page
+            result = self._shape_records(result_from_table(
+                self.driver_manager.execute_script(EXTRACT_TABLE_SCRIPT)
+            ), mst)
             
-            if "<table class" in result_html:
-                df = pd.read_html(io.StringIO(result_html))[0]
-              
-                post_scr = """
-                var table_html = ''
-                $.post('tcnnt/nganhkinhdoanh.jsp', {tin: %s}, function(result){
-                    table_html = result;
-                });
-                return table_html
-                """ % (mst)                
-                
-                nganhnghe = self.driver_manager.execute_script(post_scr)
-                
-                logging.info(nganhnghe)
-                 
-                result =  df.iloc[:-1, :]  # Remove last row
-                
-        
+            post_scr = """
+            var table_html = ''
+            $.post('tcnnt/nganhkinhdoanh.jsp', {tin: %s}, function(result){
+                table_html = result;
+            });
+            return table_html
+            """ % (mst)                
+            
+            nganhnghe = self.driver_manager.execute_script(post_scr)
+            
+            logging.info(nganhnghe)
             
             # Take screenshot
             screenshot_path = self._take_screenshot(mst)
@@ -108,6 +202,38 @@ class InvoiceChecker:
             logging.error(f"Error processing invoice {mst}: {str(e)}")
             return {'error': str(e)}
 
+    def process_invoice_row_http(self, field: str, mst: str) -> Dict:
+        """Process a single invoice row through the HTTP engine (no screenshot)."""
+        try:
+            html = self.http_engine.submit(self.LOOKUP_PAGE, field, mst)
+            return {
+                'result': self._parse_result_html(html, mst),
+                'screenshot': None
+            }
+        except Exception as e:
+            logging.error(f"Error processing invoice {mst}: {str(e)}")
+            return {'error': str(e)}
+
+    async def process_invoice_row_async(self, field: str, mst: str) -> Dict:
+        """Process a single invoice row through the asyncio engine (no screenshot)."""
+        try:
+            html = await self.async_engine.submit(self.LOOKUP_PAGE, field, mst)
+            return {
+                'result': self._parse_result_html(html, mst),
+                'screenshot': None
+            }
+        except Exception as e:
+            logging.error(f"Error processing invoice {mst}: {str(e)}")
+            return {'error': str(e)}
+
+    def _parse_result_html(self, html: str | bytes, mst: str) -> List[LookupRecord]:
+        """Parse the ta_border result table of a page into records."""
+        return self._shape_records(parse_result_page(html), mst)
+
+    def _shape_records(self, parsed: ParsedResult, mst: str) -> List[LookupRecord]:
+        """Data rows of the result, or one no-result row for the searched MST."""
+        return parsed.lookup_records(mst, self.RESULT_COLUMNS)
+
     def _fill_form_safely(self, element_id: str, value: str, clear_first: bool = True) -> None:
         """Safely fill a form field with retry logic."""
         for attempt in range(self.max_retries):
@@ -123,122 +249,160 @@ class InvoiceChecker:
                 if attempt == self.max_retries - 1:
                     raise
 
-    def _handle_captcha(self) -> None:
-        """Handle captcha solving with improved retry logic and error handling."""
+    def _handle_captcha(self, field: str, value: str) -> str:
+        """Fill `field`, solve and submit the captcha, returning 'result' or 'no_result'."""
         captcha_xpath = '/html/body/div/div[1]/div[4]/div[2]/div[2]/div/div/div[1]/form/table/tbody/tr[5]/td[2]/table/tbody/tr/td[2]/img'
-        capcha_dir = self.path.joinpath("captcha")
-        capcha_dir.mkdir(parents=True, exist_ok=True)
         
+        submits = refreshes = 0
         for attempt in range(self.max_captcha_attempts):
             try:
-                img_element = self._wait_for_element(By.XPATH, captcha_xpath)
-                capfile = str(capcha_dir.joinpath(f"captcha_{attempt}.png"))
+                img_element, image_binary, prediction = self._read_captcha(captcha_xpath)
                 
-                # Save captcha image
-                image_binary = img_element.screenshot_as_png
-                img = Image.open(io.BytesIO(image_binary))
-                img.save(capfile)
+                # Refresh the image in place rather than spend a submit on a likely miss
+                for _ in range(self.max_captcha_refreshes):
+                    if prediction.confidence >= self.captcha_min_confidence:
+                        break
+                    logging.info(f"Captcha {prediction.text} confidence {prediction.confidence:.2f} "
+                                 f"below {self.captcha_min_confidence}, refreshing")
+                    self._refresh_captcha(img_element)
+                    refreshes += 1
+                    img_element, image_binary, prediction = self._read_captcha(captcha_xpath)
                 
-                # Predict captcha
-                solved_captcha = self.predictor.predict(capfile)
-                logging.info(f"Predicted captcha: {solved_captcha}")
+                solved_captcha = prediction.text
+                logging.info(f"Predicted captcha: {solved_captcha} (confidence {prediction.confidence:.2f})")
                 
-                # Fill captcha
-                captcha_input = self._wait_for_element(By.ID, 'captcha')
-                captcha_input.clear()
-                captcha_input.send_keys(solved_captcha)
+                # Fill the form and submit
+                submits += 1
+                self._submit_form(field, value, solved_captcha)
                 
-                # Submit form
-                submit_btn = self._wait_for_element(By.CLASS_NAME, "subBtn")
-                submit_btn.click()
+                # Return as soon as the result table or the captcha error shows up
+                outcome = self.driver_manager.wait_for_script(OUTCOME_SCRIPT)
+                if outcome == 'captcha_error':
+                    self._archive_captcha(image_binary, solved_captcha, accepted=False)
+                    continue
                 
-                # Check for error message
-                try:
-                    error_xpath = "/html/body/div/div[1]/div[4]/div[2]/div[2]/div/div/div/p"
-                    error_element = self._wait_for_element(By.XPATH, error_xpath, timeout=5)
-                    
-                    if error_element.text == "Vui lòng nhập đúng mã xác nhận!":
-                        self._move_failed_captcha(capfile, solved_captcha)
-                        continue
-                    
-                except TimeoutException:
-                    self._move_successful_captcha(capfile, solved_captcha)
-                    return
+                self._archive_captcha(image_binary, solved_captcha, accepted=True)
+                self.captcha_stats.record(submits, refreshes, solved=True)
+                logging.info(f"Captcha solved with {submits} submit(s) and {refreshes} refresh(es)")
+                return outcome
                     
             except Exception as e:
                 logging.error(f"Captcha attempt {attempt + 1} failed: {str(e)}")
-                if attempt == self.max_captcha_attempts - 1:
-                    raise Exception(f"Failed to solve captcha after {self.max_captcha_attempts} attempts")
+        
+        self.captcha_stats.record(submits, refreshes, solved=False)
+        raise Exception(f"Failed to solve captcha after {self.max_captcha_attempts} attempts")
 
-    def _move_failed_captcha(self, capfile: str, solved_captcha: str) -> None:
-        """Move failed captcha to error directory."""
-        capcha_error = self.path.joinpath("captcha", "capcha_error")
-        capcha_error.mkdir(parents=True, exist_ok=True)
-        new_path = capcha_error.joinpath(f'{solved_captcha}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png')
-        os.replace(capfile, str(new_path))
+    def _read_captcha(self, captcha_xpath: str) -> Tuple[Any, bytes, Any]:
+        """Screenshot the captcha element and predict it with confidences."""
+        img_element = self._wait_for_element(By.XPATH, captcha_xpath)
+        image_binary = img_element.screenshot_as_png
+        with self._predict_lock:
+            prediction = self.predictor.predict_with_confidence(image_binary)
+        return img_element, image_binary, prediction
 
-    def _move_successful_captcha(self, capfile: str, solved_captcha: str) -> None:
-        """Move successful captcha to success directory."""
-        capcha_ok = self.path.joinpath("captcha", "capcha_ok")
-        capcha_ok.mkdir(parents=True, exist_ok=True)
-        new_path = capcha_ok.joinpath(f"{solved_captcha}.png")
-        os.replace(capfile, str(new_path))
+    def _refresh_captcha(self, img_element: Any) -> None:
+        """Load a new captcha image without submitting the form."""
+        self.driver_manager.execute_script(REFRESH_CAPTCHA_SCRIPT, img_element)
+        if self.driver_manager.wait_for_script(CAPTCHA_REFRESHED_SCRIPT) != 'loaded':
+            raise Exception("Captcha refresh failed")
 
- 
+    def _submit_form(self, field: str, value: str, solved_captcha: str) -> None:
+        """Fill the field and captcha and submit in one round trip, or key them in."""
+        if self.batched_submit:
+            try:
+                if self.driver_manager.execute_script(FILL_AND_SUBMIT_SCRIPT, field, str(value), solved_captcha):
+                    return
+            except Exception as e:
+                logging.warning(f"Batched form submit failed: {str(e)}")
+            logging.warning("Falling back to keystroke form filling")
+            self.batched_submit = False
+        
+        self._fill_form_safely(field, value)
+        
+        # Fill captcha
+        captcha_input = self._wait_for_element(By.ID, 'captcha')
+        captcha_input.clear()
+        captcha_input.send_keys(solved_captcha)
+        
+        # Submit form
+        submit_btn = self._wait_for_element(By.CLASS_NAME, "subBtn")
+        self.driver_manager.execute_script(CLEAR_OUTCOME_SCRIPT)
+        submit_btn.click()
 
-    def _take_screenshot(self, mst: str) -> str:
-        """Take and save full page screenshot."""
-        screenshot = Screenshot.Screenshot()
+    def _archive_captcha(self, image_binary: bytes, solved_captcha: str, accepted: bool) -> None:
+        """Keep the captcha in the captcha store for later training, if enabled."""
+        if self.captcha_archive:
+            self.captcha_archive.save(image_binary, solved_captcha, accepted, self.LOOKUP_PAGE)
+
+    def _take_screenshot(self, mst: str) -> str | Future:
+        """Take full page screenshot, saved inline or handed to the background writer."""
         screenshot_dir = self.data_dir.joinpath("screenshot")
         screenshot_dir.mkdir(parents=True, exist_ok=True)
         
         timestamp = datetime.now().strftime('%d%m%Y')
+        if self.screenshot_writer:
+            return self.screenshot_writer.submit(
+                self.screenshot_backend.capture_png(self.driver_manager.driver),
+                f"{mst}_{timestamp}"
+            )
+        
         filename = f"{mst}_{timestamp}.png"
         
-        return str(screenshot.full_screenshot(
+        return self.screenshot_backend.capture(
             self.driver_manager.driver,
-            save_path=str(screenshot_dir),
-            image_name=filename,
-            is_load_at_runtime=True,
-            load_wait_time=3
-        ))
+            screenshot_dir,
+            filename
+        )
 
-    def process_invoices(self, mst_list: List[str]) -> Dict[str, Any]:
-        """Process multiple MST numbers with improved error handling and reporting."""
-        results = []
-        screenshots = {}
-        total = len(mst_list)
-        
-        with self.driver_manager as driver:
-            driver.get('https://tracuunnt.gdt.gov.vn/tcnnt/mstdn.jsp')
-            self._wait_for_element(By.NAME, 'mst')  # Wait for page load
-            
-            for idx, mst in enumerate(mst_list, 1):
-                try:
-                    result = self.process_invoice_row(mst)
-                    
-                    if 'error' in result:
-                        logging.error(f"Error processing MST {mst}: {result['error']}")
-                    else:
-                        results.append(result['result'])
-                        screenshots[mst] = result['screenshot']
-                        
-                    logging.info(f"Processed {idx}/{total} MSTs")
-                    
-                except Exception as e:
-                    logging.error(f"Failed to process MST {mst}: {str(e)}")
-        
-        # Combine results
-        result_df = pd.concat(results, ignore_index=True, sort=False) if results else pd.DataFrame()
-        
-        # Add MST column if not present
-        if 'MST' not in result_df.columns and not result_df.empty:
-            result_df['MST'] = mst_list[:len(result_df)]
-        
-        return {
-            'result_df': result_df,
-            'screenshots': screenshots
-        }
+    def process_invoices(self, mst_list: List[str], resume: bool = False) -> Dict[str, Any]:
+        """
+        Process multiple MST numbers with improved error handling and reporting.
+
+        With `resume`, the last interrupted run is continued: MSTs already done
+        are not looked up again.
+        """
+        mst_list = list(mst_list)
+        lookup = lookup_type(self, 'process_invoice_row')
+        with journaled_run(self, mst_list, 'process_invoice_row', resume) as (todo, sink):
+            run_lookups(self, todo, 'process_invoice_row',
+                        on_result=lambda idx, result: self._record_outcome(sink, lookup, todo[idx], result))
+            records_df = sink.read_frame()
+            return {
+                'result_df': sink.buffer.report_frame(records_df),
+                'records_df': records_df,
+                'screenshots': sink.buffer.screenshots(records_df)
+            }
+
+    async def process_invoices_async(self, mst_list: List[str], resume: bool = False) -> Dict[str, Any]:
+        """Process multiple MST numbers over HTTP on the running event loop."""
+        mst_list = list(mst_list)
+        lookup = lookup_type(self, 'process_invoice_row')
+        with journaled_run(self, mst_list, 'process_invoice_row', resume) as (todo, sink):
+            await run_lookups_async(self, todo, 'process_invoice_row',
+                                    on_result=lambda idx, result: self._record_outcome(sink, lookup, todo[idx], result))
+            records_df = sink.read_frame()
+            return {
+                'result_df': sink.buffer.report_frame(records_df),
+                'records_df': records_df,
+                'screenshots': sink.buffer.screenshots(records_df)
+            }
+
+    def _record_outcome(self, sink: ResultSink, lookup: str, mst: str, result: Dict) -> None:
+        """
+        Write the records of one completed lookup to the sink, where the journal
+        is marked once they are on disk, and to the result cache.
+        """
+        if 'error' in result:
+            logging.error(f"Error processing MST {mst}: {result['error']}")
+            sink.add([LookupRecord(mst, ERROR, searched_id=mst, error=result['error'])], tag=(mst, FAILED, result['error']))
+            return
+        # Added once the screenshot is written, without holding up the lookup thread
+        sink.add_with_screenshot(
+            result['result'],
+            result['screenshot'],
+            tag=(mst, DONE, None),
+            on_added=(lambda records: self.result_cache.put(lookup, mst, records)) if self.result_cache else None
+        )
 
     def create_docx_report(self, df: pd.DataFrame) -> Path:
         """Create Word document report with screenshots."""
@@ -256,10 +420,10 @@ class InvoiceChecker:
             logging.error(f"Failed to create Word report: {str(e)}")
             raise
 
-    def run(self, list_mst: List[str]) -> None:
+    def run(self, list_mst: List[str], resume: bool = False) -> None:
         """Main execution method with improved error handling."""
         try:
-            results = self.process_invoices(list_mst)
+            results = self.process_invoices(list_mst, resume)
             self.create_docx_report(results['result_df'])
             logging.info("Invoice processing completed successfully")
             
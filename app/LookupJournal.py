@@ -0,0 +1,121 @@
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class LookupJournal:
+    """
+    Durable state of every ID of one lookup run: pending, done or failed, and
+    how many attempts it took.
+
+    The journal is a small SQLite file next to the run's result sink. An ID
+    is marked done or failed only once its records are written to the sink.
+    So after a crash, `--resume` skips exactly the IDs whose results are
+    already on disk.
+    """
+
+    PREFIX = 'journal'
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Marks arrive from whichever lookup thread flushes the sink
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS lookups ('
+                'id TEXT PRIMARY KEY, state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+                'error TEXT, updated TEXT)'
+            )
+            self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    @property
+    def run_name(self) -> str:
+        """'<page>_<run id>', shared with the run's result sink file."""
+        return self.path.stem[len(self.PREFIX) + 1:]
+
+    @classmethod
+    def create(cls, directory: Union[str, Path], page: str, meta: Dict[str, str]) -> 'LookupJournal':
+        """Start the journal of a new run of `page` lookups in `directory`."""
+        # Microseconds plus a random suffix, so runs started together never share files
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+        journal = cls(Path(directory) / f"{cls.PREFIX}_{Path(page).stem}_{run_id}.sqlite")
+        with journal._lock, journal._conn:
+            journal._conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', meta.items())
+        return journal
+
+    @classmethod
+    def latest(cls, reports_dir: Union[str, Path], page: str, meta: Dict[str, str]) -> Optional['LookupJournal']:
+        """
+        The newest journal of `page` lookups in any dated folder under
+        `reports_dir` whose meta matches, e.g. the same row handler, or None if
+        that run has no pending or failed IDs left: a finished run is never reopened.
+        """
+        prefix = f"{cls.PREFIX}_{Path(page).stem}_"
+        paths = Path(reports_dir).glob(f"*/{prefix}*.sqlite")
+        # The run id (YYYYmmdd_HHMMSS_ffffff_<uuid>) follows the prefix, so it sorts by start time
+        for path in sorted(paths, key=lambda p: p.stem[len(prefix):], reverse=True):
+            journal = cls(path)
+            if all(journal.get_meta(key) == value for key, value in meta.items()):
+                if journal.unfinished():
+                    return journal
+                journal.close()
+                return None
+            journal.close()
+        return None
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, ids: Iterable[str]) -> None:
+        """Register IDs as pending; IDs already in the journal keep their state."""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO lookups (id, state, updated) VALUES (?, ?, ?)',
+                ((value, PENDING, now) for value in ids)
+            )
+
+    def remaining(self, ids: Iterable[str]) -> List[str]:
+        """The IDs, in order and without repeats, that are not done yet."""
+        with self._lock:
+            done = {row[0] for row in self._conn.execute('SELECT id FROM lookups WHERE state = ?', (DONE,))}
+        return [value for value in dict.fromkeys(ids) if value not in done]
+
+    def mark(self, outcomes: List[Tuple[str, str, Optional[str]]]) -> None:
+        """Record finished attempts as (id, DONE or FAILED, error) in one transaction."""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'UPDATE lookups SET state = ?, error = ?, attempts = attempts + 1, updated = ? WHERE id = ?',
+                ((state, error, now, value) for value, state, error in outcomes)
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute('SELECT state, COUNT(*) FROM lookups GROUP BY state'))
+
+    def unfinished(self) -> int:
+        """Number of IDs still pending or failed."""
+        counts = self.counts()
+        return counts.get(PENDING, 0) + counts.get(FAILED, 0)
+
+    def summary(self) -> str:
+        counts = self.counts()
+        return (f"Run {self.run_name}: {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, "
+                f"{counts.get(PENDING, 0)} pending")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import multiprocessing as mp
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Empty
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.DriverPool import DriverPool
+from app.LookupJournal import DONE, LookupJournal
+from app.ResultSink import ResultSink, get_result_sink
+from app.ScreenshotWriter import resolve_screenshot
+from app.utils.logging_config import setup_logging
+from captcha_server import CaptchaServer
+
+
+def _worker_main(worker_id: int,
+                 checker_cls: type,
+                 checker_args: tuple,
+                 checker_kwargs: dict,
+                 row_handler: str,
+                 tasks: Any,
+                 results: Any) -> None:
+    """Worker process entry point: own checker, own Chrome session, own predictor."""
+    # Spawned children start without handlers; log to the parent's daily log file
+    setup_logging(Path(checker_args[0]) / "logs")
+    try:
+        checker = checker_cls(*checker_args, **checker_kwargs)
+        with checker.driver_manager:
+            DriverPool._park(checker.driver_manager, checker.LOOKUP_URL, checker.READY_FIELD)
+            worker = checker._bind(worker_id, checker.driver_manager)
+            while True:
+                item = tasks.get()
+                if item is None:
+                    break
+                idx, value = item
+                try:
+                    result = getattr(worker, row_handler)(value)
+                except Exception as e:
+                    result = {'error': str(e)}
+                _put_when_written(results, idx, result)
+            logging.info(f"Lookup worker {worker_id}: {checker.captcha_stats.summary()}")
+            if checker.screenshot_writer:
+                checker.screenshot_writer.close(wait=True)
+            if checker.captcha_archive:
+                checker.captcha_archive.close(wait=True)
+    except Exception as e:
+        logging.error(f"Lookup worker {worker_id} failed: {e}")
+    finally:
+        results.put((None, worker_id))
+
+
+def _put_when_written(results: Any, idx: int, result: Dict[str, Any]) -> None:
+    """Send a result to the parent once its screenshot, if still being written, is on disk."""
+    screenshot = result.get('screenshot')
+    if not isinstance(screenshot, Future):
+        results.put((idx, result))
+        return
+    screenshot.add_done_callback(
+        lambda future: results.put((idx, {**result, 'screenshot': resolve_screenshot(future)}))
+    )
+
+
+class ProcessLookupRunner:
+    """Runs lookups in worker processes pulling IDs from a shared queue."""
+
+    def __init__(self,
+                 checker_cls: type,
+                 checker_args: tuple,
+                 checker_kwargs: Dict[str, Any],
+                 workers: int = 1):
+        """
+        Initialize the runner.
+
+        Args:
+            checker_cls: InvoiceChecker or InvoiceChecker_CN, rebuilt in every worker
+            checker_args: Positional constructor arguments (must be picklable)
+            checker_kwargs: Keyword constructor arguments (must be picklable)
+            workers: Number of worker processes
+        """
+        self.checker_cls = checker_cls
+        self.checker_args = checker_args
+        self.checker_kwargs = checker_kwargs
+        self.workers = max(1, int(workers))
+        # spawn keeps TensorFlow and chromedriver state out of the children
+        self.context = mp.get_context('spawn')
+
+    def run(self, ids: List[str], row_handler: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (index, result) pairs as soon as each worker finishes a lookup."""
+        tasks = self.context.Queue()
+        results = self.context.Queue()
+        for item in enumerate(ids):
+            tasks.put(item)
+        for _ in range(self.workers):
+            tasks.put(None)
+
+        processes = [
+            self.context.Process(
+                target=_worker_main,
+                args=(worker_id, self.checker_cls, self.checker_args,
+                      self.checker_kwargs, row_handler, tasks, results),
+                daemon=True
+            )
+            for worker_id in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        pending = set(range(len(ids)))
+        running = self.workers
+        try:
+            while running and pending:
+                try:
+                    idx, result = results.get(timeout=1)
+                except Empty:
+                    # A worker killed by the OS never reports back
+                    running = min(running, sum(p.is_alive() for p in processes))
+                    continue
+                if idx is None:
+                    running -= 1
+                    continue
+                pending.discard(idx)
+                yield idx, result
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+        for idx in sorted(pending):
+            yield idx, {'error': 'Lookup worker exited before processing this ID'}
+
+
+OnResult = Callable[[int, Dict[str, Any]], None]
+
+
+def lookup_type(checker: Any, row_handler: str) -> str:
+    """'<page>/<form field>', the ResultCache namespace of a row handler's lookups."""
+    return f"{checker.LOOKUP_PAGE}/{checker.ROW_FIELDS[row_handler]}"
+
+
+@contextmanager
+def journaled_run(checker: Any,
+                  ids: List[str],
+                  row_handler: str,
+                  resume: bool = False) -> Iterator[Tuple[List[str], ResultSink]]:
+    """
+    Open the journal and result sink of a lookup run and yield the IDs to look up.
+
+    A new run gets a journal and sink in the checker's data_dir (reports/<date>/).
+    With `resume`, the newest run of the same row handler in any dated folder is
+    continued instead, unless it already finished: its IDs that are done are skipped, pending and failed ones
+    are looked up again, and the sink is appended to, so the final frame covers
+    the whole run. Sink tags are the journal marks, (id, DONE or FAILED, error).
+
+    IDs with a fresh entry in the checker's ResultCache are not yielded: their
+    cached records go straight to the sink.
+    """
+    meta = {'row_handler': row_handler}
+    journal = None
+    if resume:
+        journal = LookupJournal.latest(checker.data_dir.parent, checker.LOOKUP_PAGE, meta)
+        if journal is None:
+            logging.info("No unfinished run to resume, starting a new one")
+        else:
+            logging.info(f"Resuming {journal.summary()}")
+    if journal is None:
+        journal = LookupJournal.create(checker.data_dir, checker.LOOKUP_PAGE, {
+            **meta, 'result_sink': checker.config.get('result_sink', 'sqlite')
+        })
+
+    journal.add(ids)
+    todo = journal.remaining(ids)
+    try:
+        with get_result_sink(
+            journal.get_meta('result_sink'),
+            journal.path.parent,
+            f"results_{journal.run_name}",
+            checker.RESULT_COLUMNS,
+            batch_size=int(checker.config.get('result_sink_batch', 100)),
+            on_flush=journal.mark
+        ) as sink:
+            cache = checker.result_cache
+            if cache:
+                lookup = lookup_type(checker, row_handler)
+                cache.reset_stats()
+                misses = []
+                for value in todo:
+                    records = cache.get(lookup, value)
+                    if records:
+                        # The cache key is the normalized ID; keep it as written in this run
+                        for record in records:
+                            record.searched_id = value
+                        sink.add(records, tag=(value, DONE, None))
+                    else:
+                        misses.append(value)
+                todo = misses
+            logging.info(f"{len(todo)} of {len(ids)} IDs to look up")
+            yield todo, sink
+        if cache:
+            logging.info(cache.summary())
+        logging.info(journal.summary())
+    finally:
+        journal.close()
+
+
+def run_lookups(checker: Any,
+                ids: List[str],
+                row_handler: str,
+                on_result: Optional[OnResult] = None) -> List[Dict[str, Any]]:
+    """
+    Run `row_handler` for every ID using the checker's configured executor.
+
+    The 'thread' executor shares one interpreter across a DriverPool; the
+    'process' executor gives each worker its own interpreter, Chrome session
+    and CaptchaPredictor, or a client of one shared CaptchaServer when
+    'captcha_server' is enabled. With the 'http' engine no browser is started and
+    `pool_size` server sessions are driven from threads; the 'async' engine
+    runs the lookups on one event loop instead. Results are returned in the
+    order of `ids`, or, with `on_result`, handed to `on_result(index, result)`
+    as each lookup completes (possibly from a worker thread) and not kept, in
+    which case an empty list is returned.
+    """
+    if not ids:
+        return []
+    size = max(1, min(checker.pool_size, len(ids)))
+    outcomes: List[Dict[str, Any]] = [] if on_result else [{}] * len(ids)
+
+    def deliver(idx: int, result: Dict[str, Any]) -> None:
+        if on_result:
+            on_result(idx, result)
+        else:
+            outcomes[idx] = result
+
+    if checker.engine == 'async':
+        return asyncio.run(run_lookups_async(checker, ids, row_handler, on_result))
+
+    if checker.engine == 'http':
+        field = checker.ROW_FIELDS[row_handler]
+        checker.http_engine = checker._new_http_engine(size)
+        try:
+            with ThreadPoolExecutor(max_workers=size) as executor:
+                futures = {
+                    executor.submit(checker.process_invoice_row_http, field, value): idx
+                    for idx, value in enumerate(ids)
+                }
+                for future in as_completed(futures):
+                    deliver(futures.pop(future), future.result())
+        finally:
+            checker.http_engine.close()
+            checker.http_engine = None
+        logging.info(f"Processed {len(ids)}/{len(ids)} IDs")
+        return outcomes
+
+    if checker.executor == 'process' and size > 1:
+        config = checker.config
+        server = None
+        if config.get('captcha_server', 'False') == 'True':
+            # Workers share this process's model instead of loading their own
+            server = CaptchaServer(checker.predictor).start()
+            config = {**config, 'captcha_server_address': server.address}
+        runner = ProcessLookupRunner(
+            type(checker),
+            (checker.path, checker.data_dir, config),
+            {
+                'wait_timeout': checker.wait_timeout,
+                'max_retries': checker.max_retries,
+                'max_captcha_attempts': checker.max_captcha_attempts
+            },
+            workers=size
+        )
+        try:
+            for done, (idx, result) in enumerate(runner.run(ids, row_handler), 1):
+                deliver(idx, result)
+                logging.info(f"Processed {done}/{len(ids)} IDs")
+        finally:
+            if server:
+                server.close()
+        return outcomes
+
+    # One bound checker per session, so per-worker state survives across IDs
+    workers: Dict[int, Any] = {}
+
+    def handle(worker_id: int, manager: Any, value: str) -> Dict[str, Any]:
+        if worker_id not in workers:
+            workers[worker_id] = checker._bind(worker_id, manager)
+        return getattr(workers[worker_id], row_handler)(value)
+
+    pool = DriverPool(checker._new_driver_manager, size=size)
+    with pool.open(checker.LOOKUP_URL, checker.READY_FIELD):
+        outcomes = pool.map(ids, handle, on_result)
+    logging.info(checker.captcha_stats.summary())
+    return outcomes
+
+
+async def run_lookups_async(checker: Any,
+                            ids: List[str],
+                            row_handler: str,
+                            on_result: Optional[OnResult] = None) -> List[Dict[str, Any]]:
+    """
+    Run every lookup on the current event loop through the checker's AsyncLookupEngine.
+
+    Results are returned, or handed to `on_result`, as in `run_lookups`.
+    """
+    if not ids:
+        return []
+    field = checker.ROW_FIELDS[row_handler]
+    total = len(ids)
+    done = [0]
+
+    async def lookup(idx: int, value: str) -> Optional[Dict[str, Any]]:
+        result = await checker.process_invoice_row_async(field, value)
+        done[0] += 1
+        logging.info(f"Processed {done[0]}/{total} IDs")
+        if on_result:
+            on_result(idx, result)
+            return None
+        return result
+
+    async with checker._new_async_engine() as engine:
+        checker.async_engine = engine
+        try:
+            outcomes = await asyncio.gather(*(lookup(idx, value) for idx, value in enumerate(ids)))
+            return [] if on_result else list(outcomes)
+        finally:
+            checker.async_engine = None
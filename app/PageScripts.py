@@ -0,0 +1,90 @@
+# -*- coding: utf8 -*-
+"""JavaScript snippets run inside the tracuunnt lookup pages."""
+
+CAPTCHA_ERROR_TEXT = "Vui lòng nhập đúng mã xác nhận!"
+NO_RESULT_TEXT = "Không tìm thấy kết quả"
+
+# Remove the outcome of the previous attempt so the detector only sees the new one
+CLEAR_OUTCOME_SCRIPT = """
+var stale = document.querySelectorAll('table.ta_border, p');
+for (var i = 0; i < stale.length; i++) {
+    if (stale[i].tagName === 'TABLE' || stale[i].textContent.indexOf('%s') >= 0) {
+        stale[i].parentNode.removeChild(stale[i]);
+    }
+}
+""" % CAPTCHA_ERROR_TEXT
+
+# Returns 'result', 'no_result', 'captcha_error' or null while the page is still loading
+OUTCOME_SCRIPT = """
+var table = document.querySelector('table.ta_border');
+if (table) {
+    return table.textContent.indexOf('%s') >= 0 ? 'no_result' : 'result';
+}
+var ps = document.querySelectorAll('p');
+for (var i = 0; i < ps.length; i++) {
+    if (ps[i].textContent.indexOf('%s') >= 0) {
+        return 'captcha_error';
+    }
+}
+return null;
+""" % (NO_RESULT_TEXT, CAPTCHA_ERROR_TEXT)
+
+# Fill the lookup field and the captcha, then submit, in a single WebDriver call.
+# arguments: field name, field value, captcha text. Returns false if the form is not as expected.
+FILL_AND_SUBMIT_SCRIPT = """
+var field = document.getElementsByName(arguments[0])[0];
+var captcha = document.getElementById('captcha');
+var button = document.querySelector('.subBtn');
+if (!field || !captcha || !button) {
+    return false;
+}
+""" + CLEAR_OUTCOME_SCRIPT + """
+var inputs = [[field, arguments[1]], [captcha, arguments[2]]];
+for (var i = 0; i < inputs.length; i++) {
+    inputs[i][0].value = inputs[i][1];
+    inputs[i][0].dispatchEvent(new Event('input', {bubbles: true}));
+    inputs[i][0].dispatchEvent(new Event('change', {bubbles: true}));
+}
+button.click();
+return true;
+"""
+
+# Serialize the ta_border table as {header: [...], rows: [[...], ...]}, or null if absent.
+# Cells spanning several columns are repeated, as pd.read_html does.
+EXTRACT_TABLE_SCRIPT = """
+var table = document.querySelector('table.ta_border');
+if (!table) {
+    return null;
+}
+var header = [], rows = [];
+for (var r = 0; r < table.rows.length; r++) {
+    var cells = table.rows[r].cells, row = [];
+    for (var c = 0; c < cells.length; c++) {
+        var text = cells[c].textContent.replace(/\\s+/g, ' ').trim();
+        for (var s = 0; s < (cells[c].colSpan || 1); s++) {
+            row.push(text);
+        }
+    }
+    if (!header.length && table.rows[r].querySelector('th')) {
+        header = row;
+    } else {
+        rows.push(row);
+    }
+}
+return {header: header, rows: rows};
+"""
+
+# Load a new captcha into the form's image without submitting; arguments: the captcha <img>.
+# Progress is kept on window so CAPTCHA_REFRESHED_SCRIPT can poll it without arguments.
+REFRESH_CAPTCHA_SCRIPT = """
+var img = arguments[0];
+window.__captchaRefresh = 'pending';
+img.onload = function () { window.__captchaRefresh = 'loaded'; };
+img.onerror = function () { window.__captchaRefresh = 'failed'; };
+img.src = img.src.split('?')[0] + '?uid=' + Date.now();
+"""
+
+# Returns 'loaded' or 'failed' once the refreshed captcha settles, null while loading
+CAPTCHA_REFRESHED_SCRIPT = """
+return window.__captchaRefresh === 'pending' ? null : window.__captchaRefresh;
+"""
@@ -0,0 +1,125 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Union
+
+from app.ResultTable import ERROR, LookupRecord
+
+
+def normalize_id(value: str) -> str:
+    """MST / CCCD as a cache key: surrounding and inner spaces removed, upper case."""
+    return ''.join(str(value).split()).upper()
+
+
+class ResultCache:
+    """
+    Persistent cache of parsed lookup results, so IDs that come back in the
+    next day's sheet are not looked up again while still fresh.
+
+    Entries are keyed by lookup type ('<page>/<form field>') and normalized
+    ID, and hold the LookupRecords (with their screenshot path) of the last
+    successful lookup. Entries older than `ttl` seconds are misses, and the
+    least recently used entries beyond `max_entries` are evicted. Failed
+    lookups are never cached.
+    """
+
+    def __init__(self, path: Union[str, Path], ttl: float = 24 * 3600, max_entries: int = 100000):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use: worker processes build a checker but never touch the cache
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            with self._conn:
+                self._conn.execute(
+                    'CREATE TABLE IF NOT EXISTS results ('
+                    'lookup TEXT NOT NULL, id TEXT NOT NULL, records TEXT NOT NULL, '
+                    'created REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (lookup, id))'
+                )
+                self._conn.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        return self._conn
+
+    def get(self, lookup: str, value: str) -> Optional[List[LookupRecord]]:
+        """The cached records of a fresh entry, or None on a miss."""
+        now = time.time()
+        key = (lookup, normalize_id(value))
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute('SELECT records, created FROM results WHERE lookup = ? AND id = ?', key).fetchone()
+            if row and now - row[1] > self.ttl:
+                with conn:
+                    conn.execute('DELETE FROM results WHERE lookup = ? AND id = ?', key)
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            with conn:
+                conn.execute('UPDATE results SET last_used = ? WHERE lookup = ? AND id = ?', (now, *key))
+            self.hits += 1
+        return [self._load(record) for record in json.loads(row[0])]
+
+    def put(self, lookup: str, value: str, records: List[LookupRecord]) -> None:
+        """Store the records of a successful lookup, evicting the least recently used entries over the cap."""
+        if not records or any(record.status == ERROR for record in records):
+            return
+        now = time.time()
+        payload = json.dumps([self._dump(record) for record in records], ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                             (lookup, normalize_id(value), payload, now, now))
+                conn.execute(
+                    'DELETE FROM results WHERE rowid IN '
+                    '(SELECT rowid FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+
+    @staticmethod
+    def _dump(record: LookupRecord) -> dict:
+        data = asdict(record)
+        if record.timestamp is not None:
+            data['timestamp'] = record.timestamp.isoformat()
+        return data
+
+    @staticmethod
+    def _load(data: dict) -> LookupRecord:
+        record = LookupRecord(**data)
+        if record.timestamp is not None:
+            record.timestamp = datetime.fromisoformat(record.timestamp)
+        # The screenshot may have been cleaned up since
+        if record.screenshot and not Path(record.screenshot).exists():
+            record.screenshot = None
+        return record
+
+    def reset_stats(self) -> None:
+        """Start the hit / miss counters of a new run."""
+        with self._lock:
+            self.hits = self.misses = self.expired = 0
+
+    def summary(self) -> str:
+        """One log line with this run's hit / miss counters."""
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"Result cache: {self.hits} hits, {self.misses} misses "
+                f"({self.expired} expired), hit rate {rate:.0%}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
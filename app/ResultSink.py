@@ -0,0 +1,275 @@
+import logging
+import sqlite3
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import pandas as pd
+
+from app.ResultTable import ERROR, LookupRecord, ResultColumns
+from app.ScreenshotWriter import resolve_screenshot
+
+
+class ResultSink:
+    """
+    Append-only store for the LookupRecords of one run.
+
+    Records are buffered and written in batches of `batch_size`, so a run that
+    dies part-way keeps every flushed lookup on disk and memory stays flat no
+    matter how many IDs are looked up. `read_frame` reads the run back as the
+    result DataFrame. Safe to call from several lookup threads.
+
+    Each `add` may carry a tag; once the batch holding it is on disk the tags
+    are passed to `on_flush`, which is how the LookupJournal learns that a
+    lookup's results are durable.
+    """
+
+    name = ''
+    suffix = ''
+
+    def __init__(self,
+                 path: Union[str, Path],
+                 result_columns: Dict[str, str],
+                 batch_size: int = 100,
+                 on_flush: Optional[Callable[[List[Any]], None]] = None):
+        """
+        Args:
+            path: File to append to; created with its parent directory if missing
+            result_columns: Result table header -> LookupRecord field, in page order
+            batch_size: Records buffered before each write
+            on_flush: Called with the tags of every written batch
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = max(1, int(batch_size))
+        self.buffer = ResultColumns(result_columns)
+        self.on_flush = on_flush
+        self.written = 0
+        self._tags: List[Any] = []
+        self._lock = threading.Lock()
+        # Adds waiting on a screenshot still being written
+        self._pending = 0
+        self._pending_done = threading.Condition()
+
+    def __enter__(self) -> 'ResultSink':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def add(self, records: List[LookupRecord], tag: Any = None) -> None:
+        """Buffer the records of one lookup, writing a batch once enough are buffered."""
+        with self._lock:
+            self.buffer.extend(records)
+            if tag is not None:
+                self._tags.append(tag)
+            if len(self.buffer) >= self.batch_size:
+                self._flush()
+
+    def add_with_screenshot(self,
+                            records: List[LookupRecord],
+                            screenshot: Any,
+                            tag: Any = None,
+                            on_added: Optional[Callable[[List[LookupRecord]], None]] = None) -> None:
+        """
+        Add the records of one lookup with their screenshot path, without waiting for it.
+
+        `screenshot` is a path or the ScreenshotWriter Future of one. While the
+        Future is pending the records are added from the writer thread once it
+        resolves, so the lookup thread goes straight on to the next ID; `close`
+        and `read_frame` wait for these adds. `on_added` is called after the add.
+        """
+        def add(path: Optional[str]) -> None:
+            for record in records:
+                record.screenshot = path
+            self.add(records, tag)
+            if on_added:
+                on_added(records)
+
+        if not isinstance(screenshot, Future) or screenshot.done():
+            add(resolve_screenshot(screenshot))
+            return
+
+        def add_written(future: Future) -> None:
+            try:
+                add(resolve_screenshot(future))
+            except Exception as e:
+                # Left pending in the journal, so --resume looks the ID up again
+                logging.error(f"Failed to add lookup records: {str(e)}")
+            finally:
+                with self._pending_done:
+                    self._pending -= 1
+                    self._pending_done.notify_all()
+
+        with self._pending_done:
+            self._pending += 1
+        screenshot.add_done_callback(add_written)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not len(self.buffer):
+            return
+        self._write(self.buffer.batch_frame())
+        self.written += len(self.buffer)
+        self.buffer.clear()
+        tags, self._tags = self._tags, []
+        if self.on_flush and tags:
+            self.on_flush(tags)
+
+    def close(self) -> None:
+        """Wait for adds pending on screenshots, write what is still buffered and release the file."""
+        with self._pending_done:
+            self._pending_done.wait_for(lambda: self._pending == 0)
+        with self._lock:
+            self._flush()
+            self._close()
+
+    def read_frame(self) -> pd.DataFrame:
+        """
+        Close the sink and read every written record back as the result DataFrame.
+
+        An error row is left out once a later attempt for the same searched ID
+        (in a resumed run) succeeded, and only the last error of an ID is kept.
+        """
+        self.close()
+        if not self.written and not self.path.exists():
+            return pd.DataFrame()
+        frame = self._read()
+        if not frame.empty:
+            ids = frame[self.buffer.labels['searched_id']]
+            errors = frame[self.buffer.labels['status']] == ERROR
+            superseded = ids.isin(set(ids[~errors])) | ids.duplicated(keep='last')
+            frame = frame[~(errors & superseded)].reset_index(drop=True)
+        return self.buffer.finish(frame)
+
+    def _write(self, frame: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def _read(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        pass
+
+
+class SqliteResultSink(ResultSink):
+    """One `results` table, one transaction per batch."""
+
+    name = 'sqlite'
+    suffix = '.sqlite'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Writes are serialized by the sink lock, whichever thread flushes
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            columns = ', '.join(f'"{label}" TEXT' for label in self.buffer.labels.values())
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS results ({columns})')
+        return self._conn
+
+    def _write(self, frame: pd.DataFrame) -> None:
+        conn = self._connect()
+        placeholders = ', '.join('?' for _ in frame.columns)
+        rows = [
+            tuple(None if pd.isna(value) else str(value) for value in row)
+            for row in frame.itertuples(index=False, name=None)
+        ]
+        with conn:
+            conn.executemany(f'INSERT INTO results VALUES ({placeholders})', rows)
+
+    def _read(self) -> pd.DataFrame:
+        with sqlite3.connect(self.path) as conn:
+            return pd.read_sql_query('SELECT * FROM results ORDER BY rowid', conn)
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class CsvResultSink(ResultSink):
+    """UTF-8 CSV, header written with the first batch."""
+
+    name = 'csv'
+    suffix = '.csv'
+
+    def _write(self, frame: pd.DataFrame) -> None:
+        header = not self.path.exists() or self.path.stat().st_size == 0
+        frame.to_csv(self.path, mode='a', header=header, index=False, encoding='utf-8')
+
+    def _read(self) -> pd.DataFrame:
+        # dtype=str keeps the leading zeros of MST / CCCD numbers
+        return pd.read_csv(self.path, dtype=str, encoding='utf-8')
+
+
+class ParquetResultSink(ResultSink):
+    """
+    A directory of Parquet files, one per sink session with one row group per
+    batch, so a resumed run appends a file instead of rewriting one (needs pyarrow).
+    """
+
+    name = 'parquet'
+    suffix = '.parquet'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._writer = None
+
+    def _write(self, frame: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        timestamp = self.buffer.labels['timestamp']
+        schema = pa.schema([
+            (label, pa.timestamp('us') if label == timestamp else pa.string())
+            for label in frame.columns
+        ])
+        frame[timestamp] = pd.to_datetime(frame[timestamp])
+        table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+        if self._writer is None:
+            self.path.mkdir(exist_ok=True)
+            part = self.path / f"part-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.parquet"
+            self._writer = pq.ParquetWriter(part, schema)
+        self._writer.write_table(table)
+
+    def _read(self) -> pd.DataFrame:
+        parts = sorted(self.path.glob('part-*.parquet'))
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+RESULT_SINKS = {
+    SqliteResultSink.name: SqliteResultSink,
+    CsvResultSink.name: CsvResultSink,
+    ParquetResultSink.name: ParquetResultSink
+}
+
+
+def get_result_sink(name: str,
+                    directory: Union[str, Path],
+                    stem: str,
+                    result_columns: Dict[str, str],
+                    batch_size: int = 100,
+                    on_flush: Optional[Callable[[List[Any]], None]] = None) -> ResultSink:
+    """Return a result sink by config name ('sqlite', 'csv' or 'parquet') writing `directory/stem.<ext>`."""
+    try:
+        sink_cls = RESULT_SINKS[name]
+    except KeyError:
+        raise ValueError(f"Unknown result sink: {name}") from None
+    path = Path(directory) / f"{stem}{sink_cls.suffix}"
+    logging.info(f"Writing lookup results to {path}")
+    return sink_cls(path, result_columns, batch_size, on_flush)
@@ -0,0 +1,222 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+import lxml.html
+import pandas as pd
+
+from app.PageScripts import NO_RESULT_TEXT
+
+FOUND = 'found'
+NOT_FOUND = 'not_found'
+ERROR = 'error'
+
+
+@dataclass
+class LookupRecord:
+    """
+    One result row of a lookup: a taxpayer from the result table, the
+    no-result placeholder, or a lookup that failed.
+    """
+
+    # The row's value in the checker's ID column; the looked-up MST / CCCD if no row
+    id: str
+    status: str
+    # The MST / CCCD that was looked up, which the row's ID column may not hold
+    searched_id: Optional[str] = None
+    name: Optional[str] = None
+    # Not shown in the mstdn.jsp / mstcn.jsp result tables; left for sources that have it
+    address: Optional[str] = None
+    authority: Optional[str] = None
+    tax_id: Optional[str] = None
+    id_number: Optional[str] = None
+    # "Ngày thay đổi thông tin gần nhất"
+    updated: Optional[str] = None
+    # "Ghi chú", the taxpayer's registration status, or the no-result text
+    note: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    screenshot: Optional[str] = None
+    error: Optional[str] = None
+
+
+RECORD_FIELDS = tuple(field.name for field in fields(LookupRecord))
+
+# DataFrame columns of the fields that do not come from the result table
+RECORD_LABELS = {
+    'searched_id': 'searched_id',
+    'status': 'status',
+    'timestamp': 'timestamp',
+    'screenshot': 'screenshot_path',
+    'error': 'error'
+}
+
+
+class ParsedResult(NamedTuple):
+    """The ta_border result table of one mstdn.jsp / mstcn.jsp lookup."""
+
+    header: List[str]
+    # One record per data row, keyed by header; pager and note rows excluded
+    records: List[Dict[str, str]]
+    # Text of the "Không tìm thấy kết quả." row, if the lookup found nothing
+    no_result: Optional[str] = None
+    # The pager row links to a further page of results
+    has_next_page: bool = False
+
+    def lookup_records(self, value: str, result_columns: Dict[str, str]) -> List[LookupRecord]:
+        """
+        Typed records for the lookup of `value`.
+
+        Args:
+            value: The looked-up MST / CCCD
+            result_columns: Result table header -> LookupRecord field; headers
+                without a field (STT) are dropped
+        """
+        timestamp = datetime.now()
+        if self.no_result is not None:
+            return [LookupRecord(value, NOT_FOUND, searched_id=value, note=self.no_result, timestamp=timestamp)]
+        records = []
+        for row in self.records:
+            values = {'id': value}
+            values.update((result_columns[header], text) for header, text in row.items() if header in result_columns)
+            records.append(LookupRecord(**values, status=FOUND, searched_id=value, timestamp=timestamp))
+        return records
+
+
+def parse_result_page(html: Union[bytes, str]) -> ParsedResult:
+    """
+    Parse the result table straight from the page bytes (or text).
+
+    Raises:
+        Exception: If the page has no result table
+    """
+    if isinstance(html, bytes):
+        doc = lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding='utf-8'))
+    else:
+        doc = lxml.html.document_fromstring(html)
+
+    for table in doc.iter('table'):
+        if 'ta_border' in (table.get('class') or '').split():
+            break
+    else:
+        raise Exception("Result table not found")
+
+    header: List[str] = []
+    rows: List[List[str]] = []
+    for tr in table.iter('tr'):
+        row = []
+        is_header = False
+        for cell in tr:
+            if cell.tag not in ('td', 'th'):
+                continue
+            is_header = is_header or cell.tag == 'th'
+            text = ' '.join(cell.text_content().split())
+            row.extend([text] * int(cell.get('colspan') or 1))
+        if is_header and not header:
+            header = row
+        elif row:
+            rows.append(row)
+    return classify_rows(header, rows)
+
+
+def classify_rows(header: List[str], rows: List[List[str]]) -> ParsedResult:
+    """
+    Split table rows into data records and the no-result / pager / note rows.
+
+    Full-width rows (one cell spanning the table, so every column holds the
+    same text after colspan expansion) are never data.
+    """
+    records = []
+    no_result = None
+    has_next_page = False
+    for row in rows:
+        if len(row) > 1 and row.count(row[0]) == len(row):
+            text = row[0]
+            if NO_RESULT_TEXT in text:
+                no_result = text
+            elif text.startswith('Trang'):
+                has_next_page = '>>' in text
+            continue
+        records.append(dict(zip(header, row)))
+    return ParsedResult(header, records, no_result, has_next_page)
+
+
+def result_from_table(table: Optional[Dict[str, List]]) -> ParsedResult:
+    """Classify the {'header', 'rows'} table returned by EXTRACT_TABLE_SCRIPT."""
+    if not table:
+        raise Exception("Result table not found")
+    return classify_rows(table['header'], table['rows'])
+
+
+class ResultColumns:
+    """
+    Accumulates LookupRecords from many lookups in one list per field and builds
+    one DataFrame at the end, with categorical dtypes for low-cardinality columns.
+    """
+
+    CATEGORICAL = ('status', 'authority', 'note')
+
+    def __init__(self, result_columns: Dict[str, str]):
+        """
+        Args:
+            result_columns: Result table header -> LookupRecord field, in page order
+        """
+        # The result table's own columns, as shown in reports
+        self.page_labels = list(result_columns)
+        # LookupRecord field -> DataFrame column, in output order
+        self.labels = {field: header for header, field in result_columns.items()}
+        self.labels.update(RECORD_LABELS)
+        self.columns: Dict[str, List[Any]] = {name: [] for name in RECORD_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.columns['id'])
+
+    def append(self, record: LookupRecord) -> None:
+        for name, values in self.columns.items():
+            values.append(getattr(record, name))
+
+    def extend(self, records: List[LookupRecord]) -> None:
+        for record in records:
+            self.append(record)
+
+    def clear(self) -> None:
+        for values in self.columns.values():
+            values.clear()
+
+    def batch_frame(self) -> pd.DataFrame:
+        """Every labelled column as plain values, as written by a ResultSink."""
+        return pd.DataFrame({label: self.columns[name] for name, label in self.labels.items()},
+                            columns=list(self.labels.values()))
+
+    def finish(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Leave out optional columns no record filled in and apply the column dtypes."""
+        if frame.empty:
+            return pd.DataFrame()
+        for name, label in self.labels.items():
+            if label not in frame.columns:
+                continue
+            if name != 'id' and frame[label].isna().all():
+                frame = frame.drop(columns=label)
+            elif name in self.CATEGORICAL:
+                frame[label] = frame[label].astype('category')
+            elif name == 'timestamp':
+                frame[label] = pd.to_datetime(frame[label])
+        return frame
+
+    def report_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """The found / not-found rows of `frame` with only the result table's columns."""
+        if frame.empty:
+            return frame
+        columns = [label for label in self.page_labels if label in frame.columns]
+        return frame.loc[frame[self.labels['status']] != ERROR, columns].reset_index(drop=True)
+
+    def screenshots(self, frame: pd.DataFrame) -> Dict[str, str]:
+        """Searched ID -> screenshot path of the rows in `frame` that have one."""
+        id_label, path_label = self.labels['searched_id'], self.labels['screenshot']
+        if path_label not in frame.columns:
+            return {}
+        rows = frame[frame[path_label].notna()]
+        return dict(zip(rows[id_label], rows[path_label]))
+
+    def to_frame(self) -> pd.DataFrame:
+        """Build the DataFrame for all accumulated records."""
+        return self.finish(self.batch_frame())
@@ -0,0 +1,70 @@
+import base64
+from pathlib import Path
+from typing import Union
+
+from selenium import webdriver
+
+
+class ScrollScreenshotBackend:
+    """Full-page screenshot by scrolling and stitching (Selenium-Screenshot)."""
+
+    name = 'scroll'
+
+    def __init__(self, load_wait_time: int = 3):
+        self.load_wait_time = load_wait_time
+
+    def capture(self, driver: webdriver.Chrome, save_dir: Union[str, Path], filename: str) -> str:
+        """Capture the page and save it as `save_dir/filename`."""
+        from Screenshot import Screenshot
+
+        screenshot = Screenshot.Screenshot()
+        return str(screenshot.full_screenshot(
+            driver,
+            save_path=str(save_dir),
+            image_name=filename,
+            is_load_at_runtime=True,
+            load_wait_time=self.load_wait_time
+        ))
+
+
+class CdpScreenshotBackend:
+    """Full-page screenshot in one DevTools Page.captureScreenshot call."""
+
+    name = 'cdp'
+
+    def capture_png(self, driver: webdriver.Chrome) -> bytes:
+        """Return the whole page, beyond the viewport, as PNG bytes."""
+        metrics = driver.execute_cdp_cmd('Page.getLayoutMetrics', {})
+        size = metrics.get('cssContentSize') or metrics['contentSize']
+        result = driver.execute_cdp_cmd('Page.captureScreenshot', {
+            'format': 'png',
+            'captureBeyondViewport': True,
+            'clip': {
+                'x': 0,
+                'y': 0,
+                'width': size['width'],
+                'height': size['height'],
+                'scale': 1
+            }
+        })
+        return base64.b64decode(result['data'])
+
+    def capture(self, driver: webdriver.Chrome, save_dir: Union[str, Path], filename: str) -> str:
+        """Capture the page and save it as `save_dir/filename`."""
+        path = Path(save_dir) / filename
+        path.write_bytes(self.capture_png(driver))
+        return str(path)
+
+
+SCREENSHOT_BACKENDS = {
+    ScrollScreenshotBackend.name: ScrollScreenshotBackend,
+    CdpScreenshotBackend.name: CdpScreenshotBackend
+}
+
+
+def get_screenshot_backend(name: str = 'cdp'):
+    """Return a screenshot backend instance by config name ('cdp' or 'scroll')."""
+    try:
+        return SCREENSHOT_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown screenshot backend: {name}") from None
@@ -0,0 +1,85 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from PIL import Image
+
+
+class ScreenshotWriter:
+    """Encodes and writes captured screenshots on a bounded background thread pool."""
+
+    EXTENSIONS = {'png': 'png', 'jpeg': 'jpg', 'webp': 'webp'}
+
+    def __init__(self,
+                 save_dir: Union[str, Path],
+                 image_format: str = 'png',
+                 quality: int = 80,
+                 workers: int = 2,
+                 max_pending: int = 16):
+        """
+        Initialize the writer.
+
+        Args:
+            save_dir: Directory the screenshots are written to
+            image_format: 'png', 'jpeg' or 'webp' (the Word report cannot embed webp)
+            quality: Encoder quality for jpeg/webp
+            workers: Number of encoding threads
+            max_pending: Screenshots held in memory before submit() blocks
+        """
+        image_format = image_format.lower()
+        if image_format not in self.EXTENSIONS:
+            raise ValueError(f"Unsupported screenshot format: {image_format}")
+        self.save_dir = Path(save_dir)
+        self.image_format = image_format
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='screenshot')
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, png_bytes: bytes, stem: str) -> Future:
+        """
+        Queue PNG bytes for encoding and writing to `save_dir/stem.<ext>`.
+
+        Blocks while `max_pending` screenshots are already queued, so a fast
+        browser cannot outrun the disk and grow memory without bound.
+
+        Returns:
+            Future resolving to the written file path
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._write, png_bytes, stem)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _write(self, png_bytes: bytes, stem: str) -> str:
+        """Encode (if needed) and write one screenshot."""
+        self.save_dir.mkdir(parents=True, exist_ok=True)
+        path = self.save_dir / f"{stem}.{self.EXTENSIONS[self.image_format]}"
+
+        if self.image_format == 'png':
+            path.write_bytes(png_bytes)
+        else:
+            with Image.open(BytesIO(png_bytes)) as img:
+                img.convert('RGB').save(path, self.image_format.upper(), quality=self.quality)
+        return str(path)
+
+    def close(self, wait: bool = True) -> None:
+        """Wait for queued screenshots and stop the threads."""
+        self._executor.shutdown(wait=wait)
+
+
+def resolve_screenshot(screenshot: Any) -> Optional[str]:
+    """Return the path of a screenshot that may still be being written, or None on failure."""
+    if isinstance(screenshot, Future):
+        try:
+            return screenshot.result()
+        except Exception as e:
+            logging.error(f"Failed to write screenshot: {str(e)}")
+            return None
+    return screenshot
@@ -0,0 +1,85 @@
+"""
+Local stand-in for tracuunnt.gdt.gov.vn that replays saved pages.
+
+Layout of the pages directory (for a page such as mstdn.jsp):
+
+    mstdn.jsp               form page returned on GET
+    mstdn_result.html       page returned when the captcha is accepted
+    mstdn_error.html        page returned when the captcha is rejected
+    captcha.png             captcha image served for any *captcha* URL
+    captcha.txt             expected captcha text (optional, any text accepted if missing)
+
+Usage:
+    python -m app.utils.StandInServer <pages_dir> [port]
+
+then point the HTTP engine at it with "http_base_url": "http://127.0.0.1:<port>/tcnnt/".
+"""
+import sys
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+def make_handler(pages_dir: Path) -> type:
+    """Build a request handler class serving files from `pages_dir`."""
+    pages_dir = Path(pages_dir)
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _page_name(self) -> str:
+            return Path(urlparse(self.path).path).name
+
+        def _send(self, body: bytes, content_type: str, status: int = 200) -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            if 'JSESSIONID' not in self.headers.get('Cookie', ''):
+                self.send_header('Set-Cookie', f'JSESSIONID={uuid.uuid4().hex}; Path=/')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            name = self._page_name()
+            if 'captcha' in name:
+                self._send((pages_dir / 'captcha.png').read_bytes(), 'image/png')
+                return
+            page = pages_dir / name
+            if not page.is_file():
+                self._send(b'Not found', 'text/plain', 404)
+                return
+            self._send(page.read_bytes(), 'text/html; charset=utf-8')
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            form = parse_qs(self.rfile.read(length).decode('utf-8'))
+            stem = Path(self._page_name()).stem
+
+            expected = pages_dir / 'captcha.txt'
+            captcha = form.get('captcha', [''])[0]
+            accepted = not expected.is_file() or captcha == expected.read_text().strip()
+
+            page = pages_dir / f"{stem}_{'result' if accepted else 'error'}.html"
+            self._send(page.read_bytes(), 'text/html; charset=utf-8')
+
+    return StandInHandler
+
+
+def start_server(pages_dir: Path, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the server in a background thread and return it with its /tcnnt/ base URL."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(pages_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/tcnnt/'
+
+
+if __name__ == '__main__':
+    server = ThreadingHTTPServer(
+        ('127.0.0.1', int(sys.argv[2]) if len(sys.argv) > 2 else 8000),
+        make_handler(Path(sys.argv[1]))
+    )
+    print(f'Serving {sys.argv[1]} on http://127.0.0.1:{server.server_address[1]}/tcnnt/')
+    server.serve_forever()
@@ -0,0 +1,124 @@
+"""
+Accuracy and latency of the captcha model on labelled captchas, per backend:
+a folder named by label (captcha/capcha_ok) or a captcha store manifest
+(captcha/store/manifest.jsonl, accepted captchas only).
+
+Usage (from the project root):
+    python -m benchmarks.captcha_accuracy [--backends keras onnx:path/to/model.onnx]
+                                          [--data captcha/capcha_ok] [--output report.json]
+
+A backend is 'keras', 'onnx' or 'tflite', optionally followed by ':model_path'.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from app.CaptchaArchive import labelled_samples
+from benchmarks.timing import summarize
+from captcha_runtime import load_captcha_predictor
+
+# '[UNK]' is one decoded symbol, everything else is one character
+TOKEN = re.compile(r'\[UNK\]|.')
+MISSING = '<missing>'
+
+
+def tokens(text):
+    return TOKEN.findall(text)
+
+
+def score(labels, predictions):
+    """Sequence accuracy, per-character accuracy and a true -> predicted confusion matrix."""
+    confusion = defaultdict(Counter)
+    chars = correct_chars = 0
+    for label, prediction in zip(labels, predictions):
+        expected, actual = tokens(label), tokens(prediction)
+        for i in range(max(len(expected), len(actual))):
+            true_char = expected[i] if i < len(expected) else MISSING
+            pred_char = actual[i] if i < len(actual) else MISSING
+            confusion[true_char][pred_char] += 1
+            chars += 1
+            correct_chars += true_char == pred_char
+    correct = sum(label == prediction for label, prediction in zip(labels, predictions))
+    return {
+        'sequence_accuracy': round(correct / len(labels), 4) if labels else None,
+        'char_accuracy': round(correct_chars / chars, 4) if chars else None,
+        'confusion': {true_char: dict(row) for true_char, row in sorted(confusion.items())}
+    }
+
+
+def benchmark_backend(spec, samples, batch_size=32):
+    backend, _, model_path = spec.partition(':')
+    config = {'captcha_backend': backend}
+    if model_path:
+        config['captcha_model'] = model_path
+    predictor = load_captcha_predictor(config)
+    images = [Path(path).read_bytes() for path, _ in samples]
+    labels = [label for _, label in samples]
+
+    predictor.predict(images[0])  # warm up
+    predictions, single_timings = [], []
+    for image in images:
+        start = time.perf_counter()
+        predictions.append(predictor.predict(image))
+        single_timings.append(time.perf_counter() - start)
+
+    batch_predictions, batch_timings = [], []
+    for start_idx in range(0, len(images), batch_size):
+        start = time.perf_counter()
+        batch_predictions.extend(predictor.predict_batch(images[start_idx:start_idx + batch_size]))
+        batch_timings.append(time.perf_counter() - start)
+
+    report = {
+        'backend': backend,
+        'model': model_path or getattr(predictor, 'model_path', None),
+        **score(labels, predictions),
+        'batch_agreement': round(sum(a == b for a, b in zip(predictions, batch_predictions)) / len(images), 4),
+        'latency': {
+            'predict': summarize(single_timings),
+            'predict_batch': {
+                'batch_size': batch_size,
+                **summarize(batch_timings),
+                'per_image_ms': round(sum(batch_timings) / len(images) * 1000, 3)
+            }
+        },
+        'errors': [
+            {'file': path, 'label': label, 'prediction': prediction}
+            for (path, label), prediction in zip(samples, predictions) if label != prediction
+        ]
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Captcha accuracy and latency benchmark')
+    parser.add_argument('--backends', nargs='+', default=['keras'])
+    parser.add_argument('--data', default=str(Path('captcha') / 'capcha_ok'))
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    samples = labelled_samples(args.data)
+    if not samples:
+        parser.error(f"No labelled captchas in {args.data}")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'data': args.data,
+        'samples': len(samples),
+        'backends': [benchmark_backend(spec, samples, args.batch_size) for spec in args.backends]
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
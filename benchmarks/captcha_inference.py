@@ -0,0 +1,39 @@
+"""
+Per-call latency of Model.predict versus the traced CaptchaPredictor forward pass.
+
+Usage (from the project root):
+    python -m benchmarks.captcha_inference [model_path] [image_dir] [repeats]
+"""
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.timing import summarize, time_calls
+from check_re import CaptchaPredictor
+
+
+def benchmark(model_path: str, image_dir: Path, repeats: int = 200) -> dict:
+    """Time single-image inference on the first captcha found in `image_dir`."""
+    predictor = CaptchaPredictor(model_path)
+    image = next(Path(image_dir).glob('*.png'))
+    processed = predictor.preprocess_image(str(image))
+
+    return {
+        'image': image.name,
+        'keras_predict': summarize(time_calls(
+            lambda: predictor.prediction_model.predict(processed, verbose=0), repeats
+        )),
+        'traced_call': summarize(time_calls(
+            lambda: predictor._infer(processed).numpy(), repeats
+        )),
+        'predict_end_to_end': summarize(time_calls(
+            lambda: predictor.predict(str(image)), repeats
+        ))
+    }
+
+
+if __name__ == '__main__':
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'captcha.keras'
+    image_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path('captcha') / 'capcha_ok'
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    print(json.dumps(benchmark(model_path, image_dir, repeats), indent=2))
@@ -0,0 +1,37 @@
+"""
+Per-image captcha preprocessing versus the batched BatchPreprocessor.
+
+Usage (from the project root):
+    python -m benchmarks.captcha_preprocess [image_dir] [repeats]
+"""
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.timing import summarize, time_calls
+from captcha_runtime import BatchPreprocessor, load_image
+
+BATCH_SIZES = (1, 8, 32)
+
+
+def benchmark(image_dir, repeats=200):
+    images = [path.read_bytes() for path in sorted(Path(image_dir).glob('*.png'))]
+    preprocess_batch = BatchPreprocessor()
+    report = {'images': len(images)}
+    for batch_size in BATCH_SIZES:
+        batch = [images[i % len(images)] for i in range(batch_size)]
+        report[f'batch_{batch_size}'] = {
+            'per_image': summarize(time_calls(
+                lambda: np.stack([load_image(image) for image in batch]), repeats
+            )),
+            'batched': summarize(time_calls(lambda: preprocess_batch(batch), repeats))
+        }
+    return report
+
+
+if __name__ == '__main__':
+    image_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path('captcha') / 'capcha_ok'
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(json.dumps(benchmark(image_dir, repeats), indent=2))
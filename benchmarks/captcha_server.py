@@ -0,0 +1,87 @@
+"""
+Latency and throughput of the shared captcha server at 1, 8 and 32 concurrent
+client processes, against one process calling predict directly.
+
+Usage (from the project root):
+    python -m benchmarks.captcha_server [backend] [requests_per_client] [image_dir]
+"""
+import json
+import multiprocessing as mp
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.timing import summarize, time_calls
+from captcha_runtime import load_captcha_predictor
+from captcha_server import CaptchaClient, CaptchaServer
+
+CLIENT_COUNTS = (1, 8, 32)
+
+
+def _client_main(address, images, requests, ready, start, results):
+    """Client process: wait for the start signal, then time `requests` predictions."""
+    client = CaptchaClient(address)
+    client.predict(images[0])  # connect outside the timed loop
+    ready.put(True)
+    start.wait()
+    timings = []
+    for i in range(requests):
+        begin = time.perf_counter()
+        client.predict(images[i % len(images)])
+        timings.append(time.perf_counter() - begin)
+    client.close()
+    results.put(timings)
+
+
+def run_clients(server, images, clients, requests):
+    """Run `clients` processes against the server; returns throughput and latency."""
+    context = mp.get_context('spawn')
+    start = context.Event()
+    ready = context.Queue()
+    results = context.Queue()
+    processes = [
+        context.Process(target=_client_main, args=(server.address, images, requests, ready, start, results))
+        for _ in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+
+    begin = time.perf_counter()
+    start.set()
+    timings = []
+    for _ in processes:
+        timings.extend(results.get())
+    elapsed = time.perf_counter() - begin
+    for process in processes:
+        process.join()
+
+    return {
+        'clients': clients,
+        'throughput_per_s': round(len(timings) / elapsed, 1),
+        'latency': summarize(timings)
+    }
+
+
+def benchmark(backend='keras', requests=50, image_dir=Path('captcha') / 'capcha_ok'):
+    predictor = load_captcha_predictor({'captcha_backend': backend})
+    images = [path.read_bytes() for path in sorted(Path(image_dir).glob('*.png'))]
+
+    direct = time_calls(lambda: predictor.predict(images[0]), requests)
+    report = {
+        'backend': backend,
+        'direct_predict': {**summarize(direct), 'throughput_per_s': round(len(direct) / sum(direct), 1)},
+        'server': []
+    }
+    with CaptchaServer(predictor) as server:
+        for clients in CLIENT_COUNTS:
+            report['server'].append(run_clients(server, images, clients, requests))
+    return report
+
+
+if __name__ == '__main__':
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'keras'
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    image_dir = Path(sys.argv[3]) if len(sys.argv) > 3 else Path('captcha') / 'capcha_ok'
+    print(json.dumps(benchmark(backend, requests, image_dir), indent=2))
@@ -0,0 +1,67 @@
+"""
+Check the NumPy greedy CTC decoder against the TensorFlow decoder it replaced,
+and time both.
+
+Usage (from the project root, TensorFlow required):
+    python -m benchmarks.ctc_decoder [samples] [repeats]
+"""
+import json
+import sys
+
+import numpy as np
+import tensorflow as tf
+from keras import layers
+
+from benchmarks.timing import summarize, time_calls
+from captcha_runtime import VOCABULARY, ctc_greedy_decode
+
+# Output shape of the dense2 layer for 130x50 captchas: 32 steps, vocab + blank
+STEPS = 32
+CLASSES = len(VOCABULARY) + 1
+MAX_LENGTH = 5
+
+
+def tf_decode(pred, max_length, num_to_char):
+    """The previous decode_predictions: ctc_greedy_decoder, to_dense, StringLookup"""
+    num_samples, num_steps = pred.shape[0], pred.shape[1]
+    inputs = tf.math.log(tf.transpose(pred, perm=[1, 0, 2]) + 1e-7)
+    sequence_length = tf.fill([num_samples], num_steps)
+    decoded, _ = tf.nn.ctc_greedy_decoder(inputs=inputs, sequence_length=sequence_length)
+    st = tf.SparseTensor(decoded[0].indices, decoded[0].values, (num_samples, num_steps))
+    results = tf.sparse.to_dense(sp_input=st, default_value=-1)[:, :max_length]
+    return [tf.strings.reduce_join(num_to_char(res)).numpy().decode("utf-8") for res in results]
+
+
+def random_predictions(samples, rng):
+    """Peaked softmax outputs that mostly emit blanks, with repeats and short sequences"""
+    logits = rng.normal(size=(samples, STEPS, CLASSES)).astype(np.float32)
+    logits[..., -1] += rng.uniform(0, 4, size=(samples, STEPS, 1)).astype(np.float32)
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def benchmark(samples=2000, repeats=200):
+    num_to_char = layers.StringLookup(vocabulary=VOCABULARY, mask_token=None, invert=True)
+    vocabulary = np.array(VOCABULARY)
+    pred = random_predictions(samples, np.random.default_rng(0))
+
+    expected = tf_decode(pred, MAX_LENGTH, num_to_char)
+    actual = ctc_greedy_decode(pred, MAX_LENGTH, vocabulary)
+    mismatches = [i for i, (e, a) in enumerate(zip(expected, actual)) if e != a]
+
+    report = {'samples': samples, 'mismatches': len(mismatches)}
+    for batch in (1, 32):
+        chunk = pred[:batch]
+        report[f'batch_{batch}'] = {
+            'tf': summarize(time_calls(lambda: tf_decode(chunk, MAX_LENGTH, num_to_char), repeats)),
+            'numpy': summarize(time_calls(lambda: ctc_greedy_decode(chunk, MAX_LENGTH, vocabulary), repeats))
+        }
+    return report
+
+
+if __name__ == '__main__':
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    report = benchmark(samples, repeats)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report['mismatches'] else 0)
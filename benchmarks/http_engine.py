@@ -0,0 +1,89 @@
+"""
+Smoke test and timing of HttpLookupEngine against the local stand-in server
+(app/utils/StandInServer.py) serving the pages in benchmarks/pages/standin.
+
+The predictor reads the stand-in's expected captcha text, and with
+--reject-first answers wrong once per lookup so the captcha retry path runs too.
+Exits non-zero if a lookup does not parse back to a result row.
+
+Usage (from the project root):
+    python -m benchmarks.http_engine [lookups] [pool_size] [--reject-first]
+"""
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.HttpLookupEngine import HttpLookupEngine
+from app.ResultTable import parse_result_page
+from app.utils.StandInServer import start_server
+from benchmarks.timing import summarize, time_calls
+
+PAGES_DIR = Path(__file__).parent / 'pages' / 'standin'
+
+# (page, form field, searched ID, result id column)
+LOOKUPS = [
+    ('mstdn.jsp', 'mst', '1800277683-025', 'MST'),
+    ('mstcn.jsp', 'cmt2', '087081003427', 'Số CMT/Thẻ căn cước')
+]
+
+
+class StandInPredictor:
+    """Answers the stand-in's captcha.txt, optionally wrong on every other call of a thread."""
+
+    def __init__(self, answer: str, reject_first: bool = False):
+        self.answer = answer
+        self.reject_first = reject_first
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def predict(self, image_binary: bytes) -> str:
+        with self._lock:
+            self.calls += 1
+        # Per thread, so each lookup sees one rejection then the right answer
+        wrong = self.reject_first and not getattr(self._local, 'rejected', False)
+        self._local.rejected = wrong
+        return 'xxxxx' if wrong else self.answer
+
+
+def benchmark(lookups=50, pool_size=4, reject_first=False):
+    server, base_url = start_server(PAGES_DIR)
+    answer = (PAGES_DIR / 'captcha.txt').read_text().strip()
+    report = {}
+    try:
+        for page, field, value, id_column in LOOKUPS:
+            predictor = StandInPredictor(answer, reject_first)
+            engine = HttpLookupEngine(predictor, base_url=base_url, pool_size=pool_size)
+            failures = []
+
+            def lookup():
+                parsed = parse_result_page(engine.submit(page, field, value))
+                if not parsed.records or id_column not in parsed.header:
+                    failures.append(value)
+
+            # One sequential pass (per-lookup latency), then the pool under threads
+            timings = time_calls(lookup, lookups, warmup=1)
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                elapsed = time_calls(lambda: list(executor.map(lambda _: lookup(), range(lookups))), 1, warmup=0)[0]
+            engine.close()
+            report[page] = {
+                'sequential': summarize(timings),
+                'threaded_lookups_per_s': round(lookups / elapsed, 1),
+                'captcha_predictions': predictor.calls,
+                'failures': len(failures)
+            }
+    finally:
+        server.shutdown()
+        server.server_close()
+    return report
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    lookups = int(args[0]) if args else 50
+    pool_size = int(args[1]) if len(args) > 1 else 4
+    report = benchmark(lookups, pool_size, '--reject-first' in sys.argv)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if any(entry['failures'] for entry in report.values()) else 0)
@@ -0,0 +1,28 @@
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=utf-8" />
+<title>Thuế Việt Nam - Tra cứu thông tin người nộp thuế</title>
+<link href="/tcnnt/css/style.css" rel="stylesheet" type="text/css" />
+<script type="text/javascript" src="/tcnnt/js/jquery.js"></script>
+</head>
+<body>
+<div id="container">
+<div id="header"><img src="/tcnnt/images/banner.jpg" alt="Thuế Việt Nam" /></div>
+<div id="menu"><ul><li><a href="/tcnnt/">Trang chủ</a></li></ul></div>
+<div id="module3Content"><div>
+<form name="myform" method="post" action="/tcnnt/mstcn.jsp">
+<input type="hidden" name="cm" value="cm" />
+<table>
+<tr><td class="label">Mã số thuế</td><td><input name="mst1" type="text" value="" /></td></tr>
+<tr><td class="label">Số chứng minh thư/Thẻ căn cước</td><td><input name="cmt2" type="text" value="" /></td></tr>
+<tr><td class="label">Mã xác nhận*</td><td><table><tr><td><input id="captcha" name="captcha" type="text" /></td><td><div><img src="/tcnnt/captcha.png?uid=1" /></div></td></tr></table></td></tr>
+<tr><td></td><td><input type="button" class="subBtn" value="Tra cứu" /></td></tr>
+</table>
+</form>
+</div></div>
+<div id="footer"><p>Thuế Việt Nam - Trang thông tin điện tử của Tổng cục Thuế</p>
+<p>Cơ quan chủ quản: Bộ Tài chính - Số giấy phép: 207/GP-BC ngày 14/05/2004 do Cục Báo chí - Bộ VHTT cấp</p></div>
+</div>
+</body>
+</html>
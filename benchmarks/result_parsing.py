@@ -0,0 +1,67 @@
+"""
+pd.read_html (plus the old pager/no-result clean-up) versus parse_result_page
+and lookup_records, as the checkers run them, on saved mstdn.jsp / mstcn.jsp
+result pages.
+
+Usage (from the project root):
+    python -m benchmarks.result_parsing [page_dir] [repeats]
+"""
+import io
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from app.InvoiceChecker import InvoiceChecker
+from app.InvoiceChecker_CN import InvoiceChecker_CN
+from app.ResultTable import parse_result_page
+from benchmarks.timing import summarize, time_calls
+
+ID_COLUMNS = ('Số CMT/Thẻ căn cước', 'MST')
+
+
+def read_html_records(page: bytes, value: str = '0'):
+    """What the checkers did before: DataFrame, no-result fix-up, pager drop, records."""
+    df = pd.read_html(io.StringIO(page.decode('utf-8')), attrs={'class': 'ta_border'})[0]
+    id_column = next(column for column in ID_COLUMNS if column in df.columns)
+    if df.at[df.index[-1], id_column] == "Không tìm thấy kết quả.":
+        df.loc[0, id_column] = value
+    df.drop(df.loc[df['STT'] == "Trang: >>"].index, inplace=True)
+    return df.astype(str).to_dict('records')
+
+
+def result_columns(page: bytes):
+    """RESULT_COLUMNS of the checker whose result table the page holds"""
+    header = parse_result_page(page).header
+    return next(checker.RESULT_COLUMNS for checker in (InvoiceChecker, InvoiceChecker_CN)
+                if set(checker.RESULT_COLUMNS) <= set(header))
+
+
+def typed_records(page: bytes, columns, value: str = '0'):
+    return parse_result_page(page).lookup_records(value, columns)
+
+
+def benchmark(page_dir, repeats=200):
+    report = {}
+    for path in sorted(Path(page_dir).glob('*.html')):
+        page = path.read_bytes()
+        parsed = parse_result_page(page)
+        read_html = summarize(time_calls(lambda: read_html_records(page), repeats))
+        columns = result_columns(page)
+        direct = summarize(time_calls(lambda: typed_records(page, columns), repeats))
+        report[path.stem] = {
+            'records': len(parsed.records),
+            'no_result': parsed.no_result is not None,
+            'has_next_page': parsed.has_next_page,
+            'read_html': read_html,
+            'lookup_records': direct,
+            'speedup_p50': round(read_html['p50_ms'] / direct['p50_ms'], 2)
+        }
+    return report
+
+
+if __name__ == '__main__':
+    page_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / 'pages'
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(json.dumps(benchmark(page_dir, repeats), indent=2))
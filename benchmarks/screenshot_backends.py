@@ -0,0 +1,43 @@
+"""
+Compare full-page screenshot backends on a live Chrome session.
+
+Usage (from the project root, with bin/driver and bin/chromium in place):
+    python -m benchmarks.screenshot_backends [url] [repeats]
+"""
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.ChromeDriverManager import ChromeDriverManager
+from app.ScreenshotBackend import SCREENSHOT_BACKENDS
+
+
+def benchmark(url: str, repeats: int = 5) -> dict:
+    """Time every backend `repeats` times on the same loaded page."""
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp, ChromeDriverManager(path=Path.cwd()) as driver:
+        driver.get(url)
+        for name, backend_cls in SCREENSHOT_BACKENDS.items():
+            backend = backend_cls()
+            timings = []
+            for i in range(repeats):
+                start = time.perf_counter()
+                path = backend.capture(driver, tmp, f"{name}_{i}.png")
+                timings.append(time.perf_counter() - start)
+            report[name] = {
+                'repeats': repeats,
+                'mean_s': round(statistics.mean(timings), 3),
+                'min_s': round(min(timings), 3),
+                'max_s': round(max(timings), 3),
+                'bytes': Path(path).stat().st_size
+            }
+    return report
+
+
+if __name__ == '__main__':
+    url = sys.argv[1] if len(sys.argv) > 1 else 'https://tracuunnt.gdt.gov.vn/tcnnt/mstdn.jsp'
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(json.dumps(benchmark(url, repeats), indent=2))
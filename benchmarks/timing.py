@@ -0,0 +1,34 @@
+import math
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Summarize per-call timings (seconds) in milliseconds."""
+    return {
+        'calls': len(timings),
+        'mean_ms': round(statistics.mean(timings) * 1000, 3),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3)
+    }
+
+
+def time_calls(fn: Callable[[], object], repeats: int, warmup: int = 3) -> List[float]:
+    """Call `fn` `warmup` times untimed, then `repeats` times timed."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
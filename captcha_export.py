@@ -0,0 +1,170 @@
+"""
+Export the captcha prediction model (up to `dense2`) to ONNX and/or TFLite,
+optionally as post-training quantized TFLite variants, and check each exported
+model against Keras on labelled captchas (agreement, accuracy delta, speedup).
+
+Usage (from the project root):
+    python captcha_export.py [--model captcha.keras] [--formats onnx tflite]
+                             [--quantize int8 float16] [--samples captcha/capcha_ok]
+                             [--min-agreement 1.0]
+
+Select the exported model in config.json with "captcha_backend": "onnx" or
+"tflite", "captcha_variant": "int8" or "float16" for a quantized TFLite model
+(and "captcha_model" for a non-default path).
+"""
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+from app.CaptchaArchive import labelled_samples
+from benchmarks.timing import summarize, time_calls
+from captcha_runtime import (
+    DEFAULT_MODELS,
+    QUANTIZED_VARIANTS,
+    OnnxCaptchaPredictor,
+    TFLiteCaptchaPredictor,
+    default_model_path,
+    load_image
+)
+
+EXPORTED_PREDICTORS = {
+    'onnx': OnnxCaptchaPredictor,
+    'tflite': TFLiteCaptchaPredictor
+}
+
+
+def export_onnx(predictor, output_path, opset=13):
+    """Convert the traced forward pass to ONNX with tf2onnx"""
+    import tf2onnx
+
+    tf2onnx.convert.from_function(
+        predictor._infer,
+        input_signature=predictor._infer.input_signature,
+        opset=opset,
+        output_path=str(output_path)
+    )
+
+
+def export_tflite(predictor, output_path, variant='float', calibration=()):
+    """
+    Convert the traced forward pass to a TFLite flatbuffer.
+
+    'float16' stores float16 weights; 'int8' quantizes weights and, using the
+    calibration images to measure activation ranges, activations. Input and
+    output stay float32 so the runtime predictor is unchanged.
+    """
+    import numpy as np
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions(
+        [predictor._infer.get_concrete_function()], predictor.prediction_model
+    )
+    if variant == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == 'int8':
+        if not calibration:
+            raise ValueError("int8 quantization needs calibration captchas")
+
+        def representative_dataset():
+            for image in calibration:
+                yield [load_image(image, predictor.img_width, predictor.img_height)[np.newaxis]]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+    Path(output_path).write_bytes(converter.convert())
+
+
+def image_hash(path):
+    """SHA-256 of an image file, the name the captcha store gives it"""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def latency(predictor, image, repeats=100):
+    """Single-image predict latency"""
+    return summarize(time_calls(lambda: predictor.predict(image), repeats))
+
+
+def compare(reference, candidate, samples, batch_size=64):
+    """Predict every sample with both predictors; the file stem is the label"""
+    report = {'samples': len(samples), 'agree': 0, 'reference_correct': 0,
+              'candidate_correct': 0, 'mismatches': []}
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        expected_texts = reference.predict_batch([str(p) for p in chunk])
+        actual_texts = candidate.predict_batch([str(p) for p in chunk])
+        for path, expected, actual in zip(chunk, expected_texts, actual_texts):
+            label = path.stem.split('_')[0]
+            report['agree'] += expected == actual
+            report['reference_correct'] += expected == label
+            report['candidate_correct'] += actual == label
+            if expected != actual:
+                report['mismatches'].append({'file': path.name, 'keras': expected, 'exported': actual})
+    report['agreement'] = report['agree'] / len(samples) if samples else 1.0
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=DEFAULT_MODELS['keras'])
+    parser.add_argument('--formats', nargs='*', choices=list(EXPORTED_PREDICTORS), default=['onnx', 'tflite'])
+    parser.add_argument('--quantize', nargs='*', choices=list(QUANTIZED_VARIANTS), default=[],
+                        help='Also write quantized TFLite variants')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--samples', default=str(Path('captcha') / 'capcha_ok'))
+    parser.add_argument('--calibration', nargs='+', default=[
+        str(Path('captcha') / 'store' / 'manifest.jsonl'),
+        str(Path('captcha') / 'capcha_ok')
+    ], help='Store manifests and/or labelled folders used to calibrate int8; '
+            'images also in --samples are left out')
+    parser.add_argument('--calibration-size', type=int, default=200)
+    parser.add_argument('--min-agreement', type=float, default=1.0,
+                        help='Fail if fewer predictions than this fraction match Keras')
+    args = parser.parse_args(argv)
+
+    from check_re import CaptchaPredictor
+
+    reference = CaptchaPredictor(args.model)
+    samples = sorted(Path(args.samples).glob('*.png'))
+    # Calibrating on the evaluation images would flatter the int8 accuracy
+    evaluated = {image_hash(path) for path in samples}
+    candidates = [
+        path for source in args.calibration if Path(source).exists()
+        for path, _ in labelled_samples(source)
+    ]
+    calibration = [path for path in candidates if image_hash(path) not in evaluated]
+    if len(calibration) < len(candidates) and 'int8' in args.quantize:
+        print(f"Left {len(candidates) - len(calibration)} calibration captchas out, they are also in --samples",
+              file=sys.stderr)
+    calibration = calibration[:args.calibration_size]
+    reference_latency = latency(reference, str(samples[0])) if samples else None
+
+    targets = [(fmt, 'float') for fmt in args.formats] + [('tflite', variant) for variant in args.quantize]
+    ok = True
+    for fmt, variant in targets:
+        output_path = Path(args.output_dir) / default_model_path(fmt, variant)
+        if fmt == 'onnx':
+            export_onnx(reference, output_path)
+        else:
+            export_tflite(reference, output_path, variant, calibration)
+        candidate = EXPORTED_PREDICTORS[fmt](output_path, reference.img_width, reference.img_height)
+
+        report = compare(reference, candidate, samples)
+        report['model'] = str(output_path)
+        report['variant'] = variant
+        report['size_bytes'] = output_path.stat().st_size
+        if samples:
+            report['accuracy_delta'] = (report['candidate_correct'] - report['reference_correct']) / len(samples)
+            report['latency'] = {'keras': reference_latency, 'exported': latency(candidate, str(samples[0]))}
+            report['speedup_p50'] = round(reference_latency['p50_ms'] / report['latency']['exported']['p50_ms'], 2)
+        print(json.dumps({f"{fmt}/{variant}": report}, indent=2))
+        # Quantized variants are expected to drift; judge them by accuracy_delta instead
+        if variant == 'float':
+            ok &= report['agreement'] >= args.min_agreement
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
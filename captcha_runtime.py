@@ -0,0 +1,289 @@
+"""
+TensorFlow-free captcha inference.
+
+Runs the prediction sub-model exported by captcha_export.py with onnxruntime
+or the TFLite interpreter, using NumPy/Pillow for preprocessing and CTC
+decoding, so checkers and pool workers do not import TensorFlow at all.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+VOCABULARY = ['[UNK]', '0', '2', '3', '4', '5', '6', '7', '8', '9', 'a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'j', 'k', 'm', 'n', 'o', 'p', 'r', 'w', 'x', 'y']
+
+# Decoded text, confidence of each decoded character and of the whole greedy path
+CaptchaPrediction = namedtuple('CaptchaPrediction', ['text', 'char_confidences', 'confidence'])
+
+DEFAULT_MODELS = {
+    'keras': 'captcha.keras',
+    'onnx': 'captcha.onnx',
+    'tflite': 'captcha.tflite'
+}
+
+# Post-training quantized variants written by captcha_export.py --quantize
+QUANTIZED_VARIANTS = ('int8', 'float16')
+
+
+def default_model_path(backend, variant='float'):
+    """Default model file of a backend, e.g. captcha_int8.tflite for the int8 TFLite variant"""
+    path = DEFAULT_MODELS[backend]
+    if variant == 'float':
+        return path
+    if backend != 'tflite' or variant not in QUANTIZED_VARIANTS:
+        raise ValueError(f"No {variant} variant for the {backend} captcha backend")
+    stem, ext = path.rsplit('.', 1)
+    return f"{stem}_{variant}.{ext}"
+
+
+def _interpolation_axis(out_size, in_size):
+    """Source indices and weights of a half-pixel-centers bilinear resize along one axis"""
+    src = (np.arange(out_size, dtype=np.float32) + 0.5) * (in_size / out_size) - 0.5
+    src = np.clip(src, 0, in_size - 1)
+    lower = np.floor(src).astype(np.int64)
+    upper = np.minimum(lower + 1, in_size - 1)
+    return lower, upper, (src - lower).astype(np.float32)
+
+
+def resize_bilinear(img, height, width):
+    """Bilinear resize of a 2-D image with half-pixel centers, as tf.image.resize does"""
+    in_height, in_width = img.shape
+    if (in_height, in_width) == (height, width):
+        return img
+
+    y0, y1, wy = _interpolation_axis(height, in_height)
+    x0, x1, wx = _interpolation_axis(width, in_width)
+    top = img[y0][:, x0] * (1 - wx) + img[y0][:, x1] * wx
+    bottom = img[y1][:, x0] * (1 - wx) + img[y1][:, x1] * wx
+    return top * (1 - wy[:, None]) + bottom * wy[:, None]
+
+
+@lru_cache(maxsize=16)
+def _interpolation_matrix(out_size, in_size, scale=1.0):
+    """(out_size, in_size) matrix applying the bilinear resize along one axis, times `scale`"""
+    matrix = np.zeros((out_size, in_size), dtype=np.float32)
+    if out_size == in_size:
+        np.fill_diagonal(matrix, scale)
+        return matrix
+    lower, upper, weight = _interpolation_axis(out_size, in_size)
+    rows = np.arange(out_size)
+    np.add.at(matrix, (rows, lower), (1 - weight) * scale)
+    np.add.at(matrix, (rows, upper), weight * scale)
+    return matrix
+
+
+def decode_gray(image):
+    """Decode a file path, encoded PNG/JPEG bytes or array to a (height, width) uint8 array"""
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3 and image.shape[-1] == 1:
+            image = image[..., 0]
+        img = Image.fromarray(image)
+    elif isinstance(image, (bytes, bytearray)):
+        img = Image.open(BytesIO(bytes(image)))
+    else:
+        img = Image.open(str(image))
+
+    with img:
+        # Alpha is dropped, not composited, matching decode_image(channels=1)
+        if img.mode != 'L':
+            img = img.convert('L')
+        return np.asarray(img, dtype=np.uint8)
+
+
+def load_image(image, img_width=130, img_height=50):
+    """Load a file path, encoded PNG/JPEG bytes or array as a (width, height, 1) float32 array"""
+    pixels = decode_gray(image).astype(np.float32) / 255.0
+    pixels = resize_bilinear(pixels, img_height, img_width)
+    return np.ascontiguousarray(pixels.T[..., np.newaxis])
+
+
+class BatchPreprocessor:
+    """
+    Turns a list of captchas into one (N, width, height, 1) float32 batch.
+
+    Images are decoded one by one; scaling to [0, 1], the bilinear resize and
+    the width/height transpose then run as one batched matrix product per group
+    of equally sized images, written straight into a buffer that is reused (and
+    grown) across calls. The returned batch is a view of that buffer, valid
+    until the next call, so callers serialize access (as predict_lock does).
+    """
+
+    def __init__(self, img_width=130, img_height=50, capacity=32):
+        self.img_width = img_width
+        self.img_height = img_height
+        self._buffer = np.empty((capacity, img_width, img_height, 1), dtype=np.float32)
+
+    def __call__(self, images):
+        images = list(images)
+        n = len(images)
+        if n > len(self._buffer):
+            self._buffer = np.empty((max(n, 2 * len(self._buffer)), self.img_width, self.img_height, 1),
+                                    dtype=np.float32)
+        batch = self._buffer[:n]
+
+        decoded = [decode_gray(image) for image in images]
+        groups = {}
+        for i, pixels in enumerate(decoded):
+            groups.setdefault(pixels.shape, []).append(i)
+
+        for (in_height, in_width), indices in groups.items():
+            stack = np.stack([decoded[i] for i in indices]).astype(np.float32)
+            # (width x in_width) @ (in_width x in_height) @ (in_height x height) per image
+            resize_x = _interpolation_matrix(self.img_width, in_width, 1 / 255.0)
+            resize_y = _interpolation_matrix(self.img_height, in_height)
+            resized = resize_x @ stack.transpose(0, 2, 1) @ resize_y.T
+            if len(indices) == n:
+                batch[..., 0] = resized
+            else:
+                batch[indices, :, :, 0] = resized
+        return batch
+
+
+def ctc_greedy_decode(pred, max_length, vocabulary=VOCABULARY, with_confidence=False):
+    """
+    Greedy CTC decoding of a (batch, steps, classes) prediction.
+
+    Mirrors tf.nn.ctc_greedy_decoder with the last class as blank: repeats are
+    merged, blanks dropped, and sequences shorter than `max_length` are padded
+    with index 0, which the inverted StringLookup maps to '[UNK]'.
+
+    With `with_confidence`, returns CaptchaPrediction tuples instead of text:
+    each character's confidence is the softmax probability at the step that
+    emitted it, the sequence confidence is the probability of the whole greedy
+    path. Padded '[UNK]' positions, and sequences containing them, get 0.
+    """
+    best = np.argmax(pred, axis=-1)
+    blank = pred.shape[-1] - 1
+
+    keep = best != blank
+    keep[:, 1:] &= best[:, 1:] != best[:, :-1]
+
+    # Move kept labels to the front of each row, preserving their order
+    order = np.argsort(~keep, axis=1, kind='stable')
+    labels = np.take_along_axis(best, order, axis=1)[:, :max_length]
+    lengths = keep.sum(axis=1)
+    emitted = np.arange(labels.shape[1]) < lengths[:, None]
+    labels = np.where(emitted, labels, 0)
+
+    chars = np.asarray(vocabulary)[labels]
+    texts = [''.join(row) for row in chars]
+    if not with_confidence:
+        return texts
+
+    step_confidence = pred.max(axis=-1)
+    char_confidence = np.where(emitted, np.take_along_axis(step_confidence, order, axis=1)[:, :max_length], 0.0)
+    path_confidence = np.exp(np.log(step_confidence + 1e-7).sum(axis=1))
+    sequence_confidence = np.where(emitted.all(axis=1), path_confidence, 0.0)
+    return [
+        CaptchaPrediction(text, tuple(float(c) for c in char_row), float(confidence))
+        for text, char_row, confidence in zip(texts, char_confidence, sequence_confidence)
+    ]
+
+
+class LiteCaptchaPredictor:
+    """Base for exported-model predictors; subclasses implement _run()"""
+
+    def __init__(self, model_path, img_width=130, img_height=50):
+        self.model_path = str(model_path)
+        self.img_width = img_width
+        self.img_height = img_height
+        self.preprocess_batch = BatchPreprocessor(img_width, img_height)
+
+    def preprocess_image(self, image):
+        """Preprocess a single image into a (1, width, height, 1) batch"""
+        return load_image(image, self.img_width, self.img_height)[np.newaxis]
+
+    def decode_predictions(self, pred, max_length):
+        """Decode the raw predictions into text"""
+        return ctc_greedy_decode(pred, max_length)
+
+    def predict(self, image, max_length=5):
+        """Predict text from a single image (file path, encoded bytes or array)"""
+        return self.predict_batch([image], max_length)[0]
+
+    def predict_batch(self, image_paths, max_length=5):
+        """Predict text from a batch of images (file paths, encoded bytes or arrays)"""
+        return self.decode_predictions(self._run(self.preprocess_batch(image_paths)), max_length)
+
+    def predict_with_confidence(self, image, max_length=5):
+        """Predict a single image as a CaptchaPrediction (text and confidences)"""
+        return self.predict_batch_with_confidence([image], max_length)[0]
+
+    def predict_batch_with_confidence(self, image_paths, max_length=5):
+        """Predict a batch of images as CaptchaPrediction tuples"""
+        pred = self._run(self.preprocess_batch(image_paths))
+        return ctc_greedy_decode(pred, max_length, with_confidence=True)
+
+    def _run(self, batch):
+        raise NotImplementedError
+
+
+class OnnxCaptchaPredictor(LiteCaptchaPredictor):
+    """Runs the exported ONNX model with onnxruntime"""
+
+    def __init__(self, model_path='captcha.onnx', img_width=130, img_height=50):
+        super().__init__(model_path, img_width, img_height)
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(self.model_path, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def _run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class TFLiteCaptchaPredictor(LiteCaptchaPredictor):
+    """Runs the exported TFLite model with tflite-runtime (TensorFlow as a fallback)"""
+
+    def __init__(self, model_path='captcha.tflite', img_width=130, img_height=50):
+        super().__init__(model_path, img_width, img_height)
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=self.model_path)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self._batch_size = 1
+
+    def _run(self, batch):
+        if batch.shape[0] != self._batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+            self.interpreter.allocate_tensors()
+            self._batch_size = batch.shape[0]
+        self.interpreter.set_tensor(self.input_index, batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+
+def load_captcha_predictor(config=None):
+    """
+    Create the captcha predictor selected by config.
+
+    Reads 'captcha_backend' ('keras', 'onnx' or 'tflite'), 'captcha_variant'
+    ('float', or 'int8' / 'float16' for tflite) and optionally 'captcha_model'.
+    TensorFlow is only imported for the 'keras' backend.
+    With 'captcha_server_address' set (by run_lookups for worker processes)
+    a CaptchaClient of the shared captcha_server is returned instead.
+    """
+    config = config or {}
+    if config.get('captcha_server_address'):
+        from captcha_server import CaptchaClient
+        return CaptchaClient(config['captcha_server_address'])
+
+    backend = config.get('captcha_backend', 'keras')
+    if backend not in DEFAULT_MODELS:
+        raise ValueError(f"Unknown captcha backend: {backend}")
+
+    model_path = config.get('captcha_model') or default_model_path(backend, config.get('captcha_variant', 'float'))
+    if backend == 'onnx':
+        return OnnxCaptchaPredictor(model_path)
+    if backend == 'tflite':
+        return TFLiteCaptchaPredictor(model_path)
+
+    from check_re import CaptchaPredictor
+    return CaptchaPredictor(model_path)
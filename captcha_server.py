@@ -0,0 +1,207 @@
+"""
+Shared captcha inference over a local multiprocessing connection.
+
+One CaptchaServer owns the model; lookup worker processes talk to it through
+CaptchaClient, a drop-in for CaptchaPredictor.predict. Requests arriving within
+`max_wait` seconds of each other are answered with a single
+predict_batch_with_confidence call.
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+
+class CaptchaServer:
+    """Serves one predictor to many clients, micro-batching requests into one batch prediction"""
+
+    def __init__(self, predictor, address=None, max_batch=32, max_wait=0.005):
+        """
+        Args:
+            predictor: Any predictor with predict_batch_with_confidence(images, max_length)
+            address: Listener address, a fresh Unix socket / named pipe by default
+            max_batch: Largest batch passed to the predictor
+            max_wait: Seconds to wait for more requests after the first one
+        """
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        # Connections are authenticated with the process authkey, which spawned workers inherit
+        self.listener = Listener(address, authkey=multiprocessing.current_process().authkey)
+        self.address = self.listener.address
+        self._requests = queue.Queue()
+        self._closed = False
+        self._threads = []
+
+    def start(self):
+        """Start accepting clients and batching requests in background threads"""
+        for target in (self._accept_loop, self._batch_loop):
+            thread = threading.Thread(target=target, name='captcha-server', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, image, max_length=5):
+        """Queue one image for the next batch; returns a Future resolving to a CaptchaPrediction"""
+        future = Future()
+        self._requests.put((image, max_length, future))
+        return future
+
+    def predict(self, image, max_length=5):
+        """Predict in-process through the batcher"""
+        return self.submit(image, max_length).result().text
+
+    def predict_with_confidence(self, image, max_length=5):
+        """Predict in-process through the batcher, with confidences"""
+        return self.submit(image, max_length).result()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, ConnectionError, EOFError) as e:
+                # One client failed the authkey handshake, keep serving the others
+                if self._closed:
+                    return
+                logging.warning(f"Captcha server rejected a client: {e!r}")
+                continue
+            except Exception as e:
+                if not self._closed:
+                    logging.error(f"Captcha server stopped accepting clients: {e}")
+                return
+            if self._closed:
+                conn.close()
+                return
+            threading.Thread(target=self._serve, args=(conn,), name='captcha-client', daemon=True).start()
+
+    def _serve(self, conn):
+        """Relay one client's requests to the batcher and send back the results"""
+        with conn:
+            while True:
+                try:
+                    image, max_length = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send((True, self.submit(image, max_length).result()))
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    conn.send((False, str(e)))
+
+    def _batch_loop(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._requests.put(None)
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        by_length = defaultdict(list)
+        for image, max_length, future in batch:
+            by_length[max_length].append((image, future))
+        for max_length, items in by_length.items():
+            try:
+                predictions = self.predictor.predict_batch_with_confidence([image for image, _ in items], max_length)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(items, predictions):
+                future.set_result(prediction)
+
+    def close(self):
+        """Stop accepting clients and finish the queued requests"""
+        if self._closed:
+            return
+        self._closed = True
+        # accept() does not return when the listener is closed under it, so wake it
+        # with a throwaway connection (from a thread, in case nobody is accepting)
+        threading.Thread(target=self._wake, daemon=True).start()
+        for thread in self._threads[:1]:
+            thread.join(timeout=5)
+        self.listener.close()
+        self._requests.put(None)
+        for thread in self._threads[1:]:
+            thread.join(timeout=5)
+
+    def _wake(self):
+        try:
+            Client(self.address, authkey=multiprocessing.current_process().authkey).close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CaptchaClient:
+    """Drop-in for CaptchaPredictor.predict backed by a CaptchaServer; picklable, connects lazily"""
+
+    def __init__(self, address):
+        self.address = address
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def predict(self, image, max_length=5):
+        """Predict text from a single image (file path, encoded bytes or array)"""
+        return self.predict_with_confidence(image, max_length).text
+
+    def predict_with_confidence(self, image, max_length=5):
+        """Predict a single image as a CaptchaPrediction (text and confidences)"""
+        if not isinstance(image, (bytes, bytearray)) and not hasattr(image, 'shape'):
+            image = str(image)
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.address, authkey=multiprocessing.current_process().authkey)
+            try:
+                self._conn.send((image, max_length))
+                ok, value = self._conn.recv()
+            except (EOFError, OSError):
+                self._conn = None
+                raise
+        if not ok:
+            raise Exception(f"Captcha server error: {value}")
+        return value
+
+    def predict_batch(self, image_paths, max_length=5):
+        """Predict text from a batch of images, one request each (the server batches them)"""
+        return [self.predict(image, max_length) for image in image_paths]
+
+    def predict_batch_with_confidence(self, image_paths, max_length=5):
+        """Predict a batch of images as CaptchaPrediction tuples"""
+        return [self.predict_with_confidence(image, max_length) for image in image_paths]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __getstate__(self):
+        return {'address': self.address}
+
+    def __setstate__(self, state):
+        self.__init__(state['address'])
@@ -0,0 +1,191 @@
+"""
+Train or fine-tune the captcha model on harvested, labelled captchas.
+
+Every accepted captcha is recorded in the captcha store manifest
+(captcha/store/manifest.jsonl) with its predicted text; older harvests live in
+captcha/capcha_ok with the text as file name. This command turns both into a
+tf.data pipeline, fine-tunes captcha.keras (or trains from scratch) and writes
+a versioned model plus an accuracy report to models/.
+
+Usage (from the project root):
+    python captcha_train.py [--data captcha/store/manifest.jsonl captcha/capcha_ok ...]
+                            [--base-model captcha.keras]
+                            [--from-scratch] [--epochs 50] [--val-split 0.1]
+
+Point config.json "captcha_model" at the new file to use it.
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import tensorflow as tf
+import keras
+from keras import layers
+
+from app.CaptchaArchive import labelled_samples
+from benchmarks.captcha_accuracy import score
+from captcha_runtime import VOCABULARY
+from check_re import CTCLayer, CaptchaPredictor, ctc_batch_cost, ctc_label_dense_to_sparse
+
+IMG_WIDTH = 130
+IMG_HEIGHT = 50
+MAX_LENGTH = 5
+
+CUSTOM_OBJECTS = {
+    'CTCLayer': CTCLayer,
+    'ctc_batch_cost': ctc_batch_cost,
+    'ctc_label_dense_to_sparse': ctc_label_dense_to_sparse
+}
+
+
+def collect_samples(sources):
+    """
+    (path, label) pairs from manifests and folders whose label is MAX_LENGTH known characters.
+
+    Deduplicated on the image's SHA-256, the name the captcha store gives it, so a
+    captcha both in the store and in capcha_ok cannot land on both sides of the
+    validation split; the first source listing it wins.
+    """
+    known = set(VOCABULARY[1:])
+    samples = {}
+    for source in sources:
+        if not Path(source).exists():
+            continue
+        for path, label in labelled_samples(source):
+            if len(label) == MAX_LENGTH and set(label) <= known:
+                digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+                samples.setdefault(digest, (path, label))
+    return sorted(samples.values())
+
+
+def split_samples(samples, val_split, seed):
+    samples = list(samples)
+    random.Random(seed).shuffle(samples)
+    n_val = max(1, int(len(samples) * val_split))
+    return samples[n_val:], samples[:n_val]
+
+
+def make_dataset(samples, batch_size, shuffle=False, seed=0):
+    """Decoded once and cached; parallel map, batching and prefetch overlap with training"""
+    char_to_num = layers.StringLookup(vocabulary=VOCABULARY, mask_token=None)
+
+    def encode(path, label):
+        img = tf.io.decode_png(tf.io.read_file(path), channels=1)
+        img = tf.image.convert_image_dtype(img, tf.float32)
+        img = tf.image.resize(img, [IMG_HEIGHT, IMG_WIDTH])
+        img = tf.transpose(img, perm=[1, 0, 2])
+        label = char_to_num(tf.strings.unicode_split(label, input_encoding='UTF-8'))
+        return {'image': img, 'label': label}
+
+    paths = [path for path, _ in samples]
+    labels = [label for _, label in samples]
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    dataset = dataset.map(encode, num_parallel_calls=tf.data.AUTOTUNE).cache()
+    if shuffle:
+        dataset = dataset.shuffle(len(samples), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def build_model():
+    """The CRNN + CTC architecture captcha.keras was trained with"""
+    input_img = layers.Input(shape=(IMG_WIDTH, IMG_HEIGHT, 1), name='image', dtype='float32')
+    labels = layers.Input(name='label', shape=(None,), dtype='float32')
+
+    x = layers.Conv2D(32, (3, 3), activation='relu', kernel_initializer='he_normal',
+                      padding='same', name='Conv1')(input_img)
+    x = layers.MaxPooling2D((2, 2), name='pool1')(x)
+    x = layers.Conv2D(64, (3, 3), activation='relu', kernel_initializer='he_normal',
+                      padding='same', name='Conv2')(x)
+    x = layers.MaxPooling2D((2, 2), name='pool2')(x)
+
+    # Two 2x2 poolings: the sequence runs along the width
+    x = layers.Reshape(target_shape=((IMG_WIDTH // 4), (IMG_HEIGHT // 4) * 64), name='reshape')(x)
+    x = layers.Dense(64, activation='relu', name='dense1')(x)
+    x = layers.Dropout(0.2)(x)
+    x = layers.Bidirectional(layers.LSTM(128, return_sequences=True, dropout=0.25))(x)
+    x = layers.Bidirectional(layers.LSTM(64, return_sequences=True, dropout=0.25))(x)
+    x = layers.Dense(len(VOCABULARY) + 1, activation='softmax', name='dense2')(x)
+
+    output = CTCLayer(name='ctc_loss')(labels, x)
+    return keras.models.Model(inputs=[input_img, labels], outputs=output, name='ocr_model_v1')
+
+
+def evaluate(model_path, samples):
+    """Score a saved model on (path, label) samples"""
+    predictor = CaptchaPredictor(str(model_path), IMG_WIDTH, IMG_HEIGHT)
+    predictions = []
+    for start in range(0, len(samples), 64):
+        predictions.extend(predictor.predict_batch([path for path, _ in samples[start:start + 64]]))
+    report = score([label for _, label in samples], predictions)
+    report.pop('confusion')
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the captcha model on harvested captchas')
+    parser.add_argument('--data', nargs='+', default=[
+        str(Path('captcha') / 'store' / 'manifest.jsonl'),
+        str(Path('captcha') / 'capcha_ok')
+    ], help='Store manifests (.jsonl) and/or labelled folders')
+    parser.add_argument('--base-model', default='captcha.keras')
+    parser.add_argument('--from-scratch', action='store_true')
+    parser.add_argument('--output-dir', default='models')
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--learning-rate', type=float, default=1e-4)
+    parser.add_argument('--val-split', type=float, default=0.1)
+    parser.add_argument('--patience', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    samples = collect_samples(args.data)
+    if len(samples) < 2:
+        parser.error(f"Need at least 2 labelled captchas, found {len(samples)}")
+    train, val = split_samples(samples, args.val_split, args.seed)
+
+    if args.from_scratch:
+        model = build_model()
+    else:
+        model = keras.models.load_model(args.base_model, custom_objects=CUSTOM_OBJECTS)
+    model.compile(optimizer=keras.optimizers.Adam(args.learning_rate))
+
+    history = model.fit(
+        make_dataset(train, args.batch_size, shuffle=True, seed=args.seed),
+        validation_data=make_dataset(val, args.batch_size),
+        epochs=args.epochs,
+        callbacks=[keras.callbacks.EarlyStopping(
+            monitor='val_loss', patience=args.patience, restore_best_weights=True
+        )]
+    )
+
+    version = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model_path = output_dir / f'captcha_{version}.keras'
+    model.save(model_path)
+
+    report = {
+        'model': str(model_path),
+        'base_model': None if args.from_scratch else args.base_model,
+        'data': args.data,
+        'train_samples': len(train),
+        'val_samples': len(val),
+        'epochs_run': len(history.history['loss']),
+        'final_loss': float(history.history['loss'][-1]),
+        'best_val_loss': float(min(history.history['val_loss'])),
+        'validation': evaluate(model_path, val)
+    }
+    if not args.from_scratch:
+        report['base_validation'] = evaluate(args.base_model, val)
+
+    model_path.with_suffix('.json').write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,8 @@ import numpy as np
 from pathlib import Path
 import matplotlib.pyplot as plt
 
+from captcha_runtime import VOCABULARY, BatchPreprocessor, ctc_greedy_decode
+
 @keras.saving.register_keras_serializable()
 def ctc_batch_cost(y_true, y_pred, input_length, label_length):
     label_length = tf.cast(tf.squeeze(label_length, axis=-1), dtype="int32")
@@ -110,24 +112,47 @@ class CaptchaPredictor:
         # Load vocabulary
          
         self.char_to_num = self._load_vocabulary()
+        # Plain index -> character table for the NumPy decoder
+        self.vocabulary = np.array(self.char_to_num.get_vocabulary())
       
         self.num_to_char = layers.StringLookup(
             vocabulary=self.char_to_num.get_vocabulary(), 
             mask_token=None, 
             invert=True
         )
+        
+        # Traced forward pass with a fixed input signature: skips the data adapter
+        # and execution loop that Model.predict rebuilds on every call
+        self._infer = tf.function(
+            lambda images: self.prediction_model(images, training=False),
+            input_signature=[tf.TensorSpec([None, img_width, img_height, 1], tf.float32)]
+        )
+        # Decodes whole batches into one reused array for the traced call
+        self.preprocess_batch = BatchPreprocessor(img_width, img_height)
+        # Warm up so the first captcha does not pay for tracing
+        self._infer(tf.zeros([1, img_width, img_height, 1], tf.float32))
 
     def _load_vocabulary(self):
         """Load the character vocabulary from vocab.txt"""      
-        vocab = ['[UNK]', '0', '2', '3', '4', '5', '6', '7', '8', '9', 'a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'j', 'k', 'm', 'n', 'o', 'p', 'r', 'w', 'x', 'y']
-  
-        return layers.StringLookup(vocabulary=vocab, mask_token=None)
+        return layers.StringLookup(vocabulary=VOCABULARY, mask_token=None)
        
 
-    def preprocess_image(self, image_path):
-        """Preprocess a single image for prediction"""
-        img = tf.io.read_file(image_path)
-        img = tf.io.decode_png(img, channels=1)
+    def preprocess_image(self, image):
+        """Preprocess a single image (file path, encoded PNG/JPEG bytes or array) for prediction"""
+        if isinstance(image, np.ndarray):
+            img = tf.convert_to_tensor(image)
+            if img.shape.rank == 2:
+                img = tf.expand_dims(img, axis=-1)
+            if img.shape[-1] == 4:
+                img = img[..., :3]
+            if img.shape[-1] == 3:
+                img = tf.image.rgb_to_grayscale(img)
+        else:
+            if isinstance(image, (bytes, bytearray)):
+                img = tf.constant(bytes(image))
+            else:
+                img = tf.io.read_file(str(image))
+            img = tf.io.decode_image(img, channels=1, expand_animations=False)
         img = tf.image.convert_image_dtype(img, tf.float32)
         img = tf.image.resize(img, [self.img_height, self.img_width])
         img = tf.transpose(img, perm=[1, 0, 2])
@@ -160,29 +185,28 @@ class CaptchaPredictor:
         return decoded_dense, log_prob
 
     def decode_predictions(self, pred, max_length):
-        """Decode the raw predictions into text"""
-        input_len = np.ones(pred.shape[0]) * pred.shape[1]
-        results = self.ctc_decode(pred, input_length=input_len, greedy=True)[0][0][:, :max_length]
-        
-        output_text = []
-        for res in results:
-            text = tf.strings.reduce_join(self.num_to_char(res)).numpy().decode("utf-8")
-            output_text.append(text)
-        return output_text
+        """Decode the raw predictions into text (greedy CTC in NumPy, see captcha_runtime)"""
+        return ctc_greedy_decode(np.asarray(pred), max_length, self.vocabulary)
     
    
-    def predict(self, image_path, max_length=5):
-        """Predict text from a single image"""
-        processed_img = self.preprocess_image(image_path)
-        pred = self.prediction_model.predict(processed_img, verbose=0)
-        return self.decode_predictions(pred, max_length)[0]
+    def predict(self, image, max_length=5):
+        """Predict text from a single image (file path, encoded bytes or array)"""
+        return self.predict_batch([image], max_length)[0]
 
     def predict_batch(self, image_paths, max_length=5):
-        """Predict text from a batch of images"""
-        processed_images = tf.concat([self.preprocess_image(img) for img in image_paths], axis=0)
-        preds = self.prediction_model.predict(processed_images, verbose=0)
+        """Predict text from a batch of images (file paths, encoded bytes or arrays)"""
+        preds = self._infer(self.preprocess_batch(image_paths)).numpy()
         return self.decode_predictions(preds, max_length)
 
+    def predict_with_confidence(self, image, max_length=5):
+        """Predict a single image as a CaptchaPrediction (text, per-character and sequence confidence)"""
+        return self.predict_batch_with_confidence([image], max_length)[0]
+
+    def predict_batch_with_confidence(self, image_paths, max_length=5):
+        """Predict a batch of images as CaptchaPrediction tuples"""
+        preds = self._infer(self.preprocess_batch(image_paths)).numpy()
+        return ctc_greedy_decode(preds, max_length, self.vocabulary, with_confidence=True)
+
     def visualize_predictions(self, image_paths, figsize=(15, 5)):
         """Visualize predictions with images"""
         predictions = self.predict_batch(image_paths)
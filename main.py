@@ -1,4 +1,5 @@
 # -*- coding: utf8 -*-
+import argparse
 import json
 import logging
 import os
@@ -10,6 +11,10 @@ from app.InvoiceChecker import InvoiceChecker
 from app.utils.logging_config import setup_logging
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description='Look up MSTs on mstdn.jsp')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the last interrupted run, skipping MSTs already done')
+    args = parser.parse_args()
     try:
         # Get current working directory and date
         path = os.getcwd()
@@ -28,7 +33,7 @@ def main():
         checker = InvoiceChecker(path, str(data_dir), config)
         list_mst = {'0100150619-041','0100150619-052'}
         
-        checker.run(list_mst)
+        checker.run(list_mst, resume=args.resume)
         
     except Exception as e:
         logging.error(f"Critical error in main: {str(e)}")
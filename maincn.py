@@ -1,4 +1,5 @@
 # -*- coding: utf8 -*-
+import argparse
 import json
 import logging
 import os
@@ -15,6 +16,10 @@ import pandas as pd
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description='Look up CCCD numbers on mstcn.jsp')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the last interrupted run, skipping CCCDs already done')
+    args = parser.parse_args()
     try:
         # Get current working directory and date
         path = os.getcwd()
@@ -37,7 +42,7 @@ def main():
         list_mst = df['CCCD'].astype('str').values.tolist()
  
         
-        results = checker.process_invoices_cccd(list_mst)
+        results = checker.process_invoices_cccd(list_mst, resume=args.resume)
         print(results['result_df']) 
         # Save results to Excel file
         results['result_df'].to_excel(data_dir / 'results.xlsx', index=False)